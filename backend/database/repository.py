@@ -299,6 +299,25 @@ class Repository:
         result = await self.db.execute(query)
         return result.scalars().all()
 
+    async def get_p95_completion_tokens(self, prompt_name: str, min_samples: int = 10) -> Optional[int]:
+        """Get the 95th-percentile completion length for a prompt (None if history is too thin)"""
+        base = select(TokenUsage.completion_tokens).join(
+            PromptTemplate, TokenUsage.prompt_template_id == PromptTemplate.id
+        ).where(
+            and_(PromptTemplate.name == prompt_name, TokenUsage.completion_tokens.isnot(None))
+        )
+        result = await self.db.execute(select(func.count()).select_from(base.subquery()))
+        count = result.scalar() or 0
+        if count < min_samples:
+            return None
+        
+        # Nearest-rank percentile (SQLite has no percentile_cont)
+        offset = int(0.95 * (count - 1))
+        result = await self.db.execute(
+            base.order_by(TokenUsage.completion_tokens).offset(offset).limit(1)
+        )
+        return result.scalar()
+
     async def get_usage_summary_for_session(self, session_id: str) -> Dict[str, Any]:
         """Get aggregated usage summary for a session"""
         query = select(TokenUsage).where(TokenUsage.session_id == session_id)
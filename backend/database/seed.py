@@ -7,10 +7,11 @@ logger = logging.getLogger(__name__)
 
 # Default prompt templates
 DEFAULT_PROMPTS = {
-    'youtube_summary': '''You are a podcast summary expert. Based on the following transcript from a podcast episode featuring {guest_name}, {guest_title} at {guest_company}, generate a compelling 3-paragraph YouTube description summary.
-
-Transcript:
+    'youtube_summary': '''<transcript>
 {transcript}
+</transcript>
+
+You are a podcast summary expert. Based on the transcript above from a podcast episode featuring {guest_name}, {guest_title} at {guest_company}, generate a compelling 3-paragraph YouTube description summary.
 
 Create a summary that:
 1. Hooks viewers in the first paragraph with the main topic
@@ -19,12 +20,13 @@ Create a summary that:
 
 Generate only the 3-paragraph summary, no numbering or extra formatting.''',
 
-    'blog_post': '''You are an expert blog writer. Write a comprehensive 2000-word blog post based on this podcast transcript featuring {guest_name}, {guest_title} at {guest_company}.
+    'blog_post': '''<transcript>
+{transcript}
+</transcript>
 
-Guest LinkedIn: {guest_linkedin}
+You are an expert blog writer. Write a comprehensive 2000-word blog post based on this podcast transcript featuring {guest_name}, {guest_title} at {guest_company}.
 
-Transcript:
-{transcript}
+Guest LinkedIn: {guest_linkedin}
 
 The blog post should:
 1. Have an engaging introduction that hooks the reader
@@ -35,10 +37,11 @@ The blog post should:
 
 Write the complete blog post.''',
 
-    'clickbait_titles': '''Generate exactly 20 clickbait-style YouTube video titles for a podcast episode featuring {guest_name} from {guest_company}.
-
-Transcript excerpt:
+    'clickbait_titles': '''<transcript>
 {transcript}
+</transcript>
+
+Generate exactly 20 clickbait-style YouTube video titles for a podcast episode featuring {guest_name} from {guest_company}.
 
 Requirements:
 - Each title must be under 100 characters
@@ -48,32 +51,39 @@ Requirements:
 
 Generate the 20 titles now.''',
 
-    'two_line_summary': '''Summarize this podcast transcript in exactly 2 lines (2 sentences max):
-
+    'two_line_summary': '''<transcript>
 {transcript}
+</transcript>
 
-Make it punchy and interesting for social media.''',
+Summarize this podcast transcript in exactly 2 lines (2 sentences max).
 
-    'quotes': '''Extract exactly 20 of the most quotable moments from this podcast transcript that would work well as quote graphics on social media.
+Make it punchy and interesting for social media.''',
 
+    'quotes': '''<transcript>
 {transcript_with_timecodes}
+</transcript>
 
-Format each quote as a standalone statement. Number them 1-20.''',
+Extract exactly 20 of the most quotable moments from this podcast transcript that would work well as quote graphics on social media.
 
-    'chapter_timestamps': '''Create YouTube chapter timestamps for this podcast based on the transcript and {video_duration} second duration.
+Format each quote as a standalone statement. Number them 1-20.''',
 
-Transcript segments:
+    'chapter_timestamps': '''<transcript>
 {transcript_with_timecodes}
+</transcript>
+
+Create YouTube chapter timestamps for this podcast based on the transcript and {video_duration} second duration.
 
 Format each line as: HH:MM:SS - Chapter Title
 
 Generate logical chapter breaks that improve viewer navigation.''',
 
-    'linkedin_post': '''Write a professional LinkedIn post for {guest_name}, {guest_title} at {guest_company}.
+    'linkedin_post': '''<transcript>
+{transcript}
+</transcript>
+
+Write a professional LinkedIn post for {guest_name}, {guest_title} at {guest_company}.
 
 Guest LinkedIn: {guest_linkedin}
-Podcast transcript:
-{transcript}
 
 The post should:
 1. Start with an engaging hook
@@ -83,10 +93,11 @@ The post should:
 
 Keep it to 1-2 paragraphs plus bullets.''',
 
-    'keywords': '''Extract 10-15 SEO-friendly keywords from this podcast featuring {guest_name}, {guest_title} at {guest_company}.
-
-Transcript:
+    'keywords': '''<transcript>
 {transcript}
+</transcript>
+
+Extract 10-15 SEO-friendly keywords from this podcast featuring {guest_name}, {guest_title} at {guest_company}.
 
 Return only comma-separated keywords, max 500 characters total. Focus on searchable topics discussed.''',
 }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Generate content for many episodes in one non-interactive run.
+
+Reads a JSON list of episodes, each holding generate_all_content's arguments
+(transcript, transcript_with_timecodes, guest_name, guest_title, guest_company,
+guest_linkedin, optional video_title/video_duration) plus an optional episode_id,
+and writes a JSON list of {episode_id, content, token_usage} in input order.
+
+With --batch (or BATCH_MODE=1) all prompts go through the OpenAI Batch API:
+half the token price, results within 24h, and the run waits until they arrive.
+
+Usage: python generate_episodes.py episodes.json [-o results.json] [--batch]
+"""
+
+import sys
+import json
+import asyncio
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+from services.openai_service import OpenAIService
+from services.content_generator import ContentGenerator
+from services.prompts_service import get_prompts_service
+from services.usage_tracker import UsageTracker
+
+logger = logging.getLogger(__name__)
+
+
+async def run(episodes, batch=False):
+    """Generate every episode and record the token usage"""
+    openai_service = OpenAIService()
+    content_generator = ContentGenerator(openai_service, get_prompts_service())
+    usage_tracker = UsageTracker()
+    try:
+        if batch:
+            results = await content_generator.generate_all_batch(episodes)
+        else:
+            results = await content_generator.generate_all_for_episodes(episodes)
+    finally:
+        await openai_service.cache.close()
+
+    output = []
+    for index, (episode, (content, token_usage)) in enumerate(zip(episodes, results)):
+        if token_usage:
+            usage_tracker.track_openai_usage(
+                prompt_tokens=token_usage.get("prompt_tokens", 0),
+                completion_tokens=token_usage.get("completion_tokens", 0),
+                total_tokens=token_usage.get("total_tokens", 0),
+                model=token_usage.get("model", "gpt-4o-mini")
+            )
+        output.append({
+            'episode_id': episode.get('episode_id') or str(index),
+            'content': content,
+            'token_usage': token_usage
+        })
+    return output
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate content for a list of episodes")
+    parser.add_argument('episodes', help="JSON file with a list of episodes")
+    parser.add_argument('-o', '--output', help="Write results here instead of stdout")
+    parser.add_argument('--batch', action='store_true', help="Submit through the OpenAI Batch API")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    with open(args.episodes, encoding='utf-8') as f:
+        episodes = json.load(f)
+    if not isinstance(episodes, list):
+        print(f"Error: {args.episodes} must contain a JSON list of episodes", file=sys.stderr)
+        sys.exit(1)
+
+    output = asyncio.run(run(episodes, batch=args.batch))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"Wrote results for {len(output)} episodes to {args.output}")
+    else:
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,14 @@ import hashlib
 import time
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from dotenv import load_dotenv
 import logging
 from typing import Optional, Dict
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import tempfile
 import assemblyai as aai
@@ -17,8 +19,8 @@ import uuid
 from models import ProcessVideoRequest, GenerateContentRequest, ProcessVideoResponse, GenerateContentResponse
 from services.youtube_service import YouTubeService
 from services.openai_service import OpenAIService
-from services.content_generator import ContentGenerator
-from services.prompts_service import PromptsService
+from services.content_generator import ContentGenerator, refresh_task_max_tokens
+from services.prompts_service import get_prompts_service
 from services.usage_tracker import UsageTracker
 from utils.file_handler import FileHandler
 from utils.cost_calculator import calculate_token_cost
@@ -54,11 +56,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compress text responses (frontend assets, transcript JSON); tiny responses aren't worth it
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Initialize services
 youtube_service = YouTubeService()
 openai_service = OpenAIService()
-prompts_service = PromptsService()
+prompts_service = get_prompts_service()
 content_generator = ContentGenerator(openai_service, prompts_service)
 usage_tracker = UsageTracker()
 
@@ -81,6 +85,25 @@ file_handler = FileHandler(upload_dir=youtube_service.upload_dir, max_age_hours=
 # Store MP3 file paths by video ID (in production, use Redis or database)
 # Format: {video_id: file_path}
 mp3_files = {}
+# Transcripts produced by /api/process-video, so /api/generate-content can take just the video_id
+# instead of the client re-uploading the full transcript. Format: {video_id: {transcript, transcript_with_timecodes}}
+TRANSCRIPT_STORE_SIZE = 32
+transcript_store: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def resolve_transcript(request: GenerateContentRequest) -> GenerateContentRequest:
+    """Fill a request's transcript fields from transcript_store when the client sent only video_id"""
+    if request.transcript is not None:
+        if request.transcript_with_timecodes is None:
+            request.transcript_with_timecodes = []
+        return request
+    stored = transcript_store.get(request.video_id) if request.video_id else None
+    if stored is None:
+        # 410 tells the client to resend with the full transcript
+        raise HTTPException(status_code=410, detail="Transcript not available on server; resend with transcript")
+    request.transcript = stored["transcript"]
+    request.transcript_with_timecodes = stored["transcript_with_timecodes"]
+    return request
 
 # Pre-compute hash of master password for fast verification
 MASTER_PASSWORD_HASH = hashlib.sha256(MASTER_PASSWORD.encode()).hexdigest()
@@ -89,10 +112,10 @@ MASTER_PASSWORD_HASH = hashlib.sha256(MASTER_PASSWORD.encode()).hexdigest()
 scheduler = AsyncIOScheduler()
 
 async def periodic_cleanup():
-    """Periodic cleanup task to remove old MP3 files (runs every 2 weeks)"""
+    """Periodic cleanup task to remove old MP3 files (runs hourly)"""
     try:
         logger.info("Starting periodic cleanup of old MP3 files...")
-        deleted_count = file_handler.cleanup_old_files()
+        deleted_count = await file_handler.cleanup_old_files_async()
         
         # Always clean up mp3_files dictionary entries for orphaned files
         # (files deleted by cleanup task, manual deletions, or external processes)
@@ -110,15 +133,33 @@ async def periodic_cleanup():
     except Exception as e:
         logger.error(f"Error during periodic cleanup: {str(e)}", exc_info=True)
 
-# Schedule periodic cleanup every 2 weeks (14 days = 1209600 seconds)
+# Schedule periodic cleanup hourly, so files go within an hour of reaching max age. Ticks between
+# FileHandler's daily full sweeps only re-check files that are due, so frequent runs stay cheap.
 scheduler.add_job(
     periodic_cleanup,
-    trigger=IntervalTrigger(weeks=2),
+    trigger=IntervalTrigger(hours=1),
     id='cleanup_old_files',
     name='Cleanup old MP3 files',
     replace_existing=True
 )
 
+async def refresh_completion_budgets():
+    """Re-tune per-task max_tokens from historical completion lengths (runs hourly)"""
+    try:
+        async with AsyncSessionLocal() as session:
+            budgets = await refresh_task_max_tokens(Repository(session))
+        logger.info(f"Refreshed completion token budgets: {budgets}")
+    except Exception as e:
+        logger.error(f"Error refreshing completion token budgets: {str(e)}", exc_info=True)
+
+scheduler.add_job(
+    refresh_completion_budgets,
+    trigger=IntervalTrigger(hours=1),
+    id='refresh_completion_budgets',
+    name='Refresh per-task max_tokens',
+    replace_existing=True
+)
+
 # Start scheduler when app starts
 @app.on_event("startup")
 async def startup_event():
@@ -148,6 +189,9 @@ async def startup_event():
         except Exception as template_err:
             logger.error(f"⚠ Prompt template initialization error (app will continue): {str(template_err)}", exc_info=True)
         
+        # Tune completion budgets from token_usage history
+        await refresh_completion_budgets()
+        
         # Start scheduler
         try:
             logger.info("Starting background scheduler...")
@@ -172,6 +216,7 @@ async def startup_event():
 async def shutdown_event():
     scheduler.shutdown()
     logger.info("Scheduler stopped.")
+    file_handler.close()
 
 # Cookie file directory - COMMENTED OUT: pytube doesn't support cookies
 # COOKIES_DIR = os.path.join(os.path.dirname(__file__), "cookies")
@@ -200,22 +245,8 @@ frontend_path = os.path.abspath(frontend_path)
 
 # Serve static files (CSS, JS, images)
 if os.path.exists(frontend_path):
+    # styles.css and app.js are served from here too; StaticFiles handles conditional requests (304s)
     app.mount("/static", StaticFiles(directory=frontend_path), name="static")
-    
-    # Serve CSS and JS files
-    @app.get("/styles.css")
-    async def serve_css():
-        css_path = os.path.join(frontend_path, "styles.css")
-        if os.path.exists(css_path):
-            return FileResponse(css_path, media_type="text/css")
-        raise HTTPException(status_code=404, detail="CSS file not found")
-    
-    @app.get("/app.js")
-    async def serve_js():
-        js_path = os.path.join(frontend_path, "app.js")
-        if os.path.exists(js_path):
-            return FileResponse(js_path, media_type="application/javascript")
-        raise HTTPException(status_code=404, detail="JS file not found")
 
 @app.get("/")
 async def serve_frontend():
@@ -461,6 +492,14 @@ async def process_video(
                 "error_details": full_traceback[:500] if len(full_traceback) > 500 else full_traceback
             }
         
+        if transcript_data.get("transcript"):
+            transcript_store[video_id] = {
+                "transcript": transcript_data["transcript"],
+                "transcript_with_timecodes": transcript_data.get("transcript_with_timecodes", [])
+            }
+            if len(transcript_store) > TRANSCRIPT_STORE_SIZE:
+                transcript_store.popitem(last=False)
+        
         # Store MP3 file path for download (don't cleanup immediately)
         if audio_path and os.path.exists(audio_path):
             mp3_files[video_id] = audio_path
@@ -490,6 +529,7 @@ async def generate_content(request: GenerateContentRequest,
     """Generate all content using OpenAI based on transcript and guest info"""
     if not verify_auth(credentials):
         raise HTTPException(status_code=401, detail="Authentication required")
+    resolve_transcript(request)
     try:
         # Create or use existing session
         session_id = request.session_id or str(uuid.uuid4())
@@ -577,6 +617,8 @@ async def generate_single_content(
     if content_type not in valid_types:
         raise HTTPException(status_code=400, detail=f"Invalid content type. Valid types: {', '.join(valid_types.keys())}")
     
+    resolve_transcript(request)
+    
     try:
         method_name = valid_types[content_type]
         method = getattr(content_generator, method_name)
@@ -799,7 +841,7 @@ async def get_prompts(credentials: Optional[HTTPAuthorizationCredentials] = Depe
     if not verify_auth(credentials):
         raise HTTPException(status_code=401, detail="Authentication required")
     try:
-        prompts = prompts_service.get_all_prompts()
+        prompts = dict(prompts_service.get_all_prompts())
         return {"success": True, "prompts": prompts}
     except Exception as e:
         logger.error(f"Error fetching prompts: {str(e)}", exc_info=True)
@@ -7,7 +7,8 @@ class ProcessVideoRequest(BaseModel):
 class ProcessVideoResponse(BaseModel):
     success: bool
     transcript: str = Field(..., description="Full transcript text")
-    transcript_with_timecodes: List[dict] = Field(..., description="Transcript with timecodes")
+    # Bare list: cues are built server-side, so pydantic need not walk every element on the way out
+    transcript_with_timecodes: list = Field(..., description="Transcript with timecodes")
     video_title: Optional[str] = Field(None, description="Video title")
     video_duration: Optional[float] = Field(None, description="Video duration in seconds")
     video_id: Optional[str] = Field(None, description="YouTube video ID for downloading MP3")
@@ -21,8 +22,9 @@ class GuestInfo(BaseModel):
     linkedin: str = Field(..., description="LinkedIn profile URL")
 
 class GenerateContentRequest(BaseModel):
-    transcript: str = Field(..., description="Full transcript text")
-    transcript_with_timecodes: List[dict] = Field(..., description="Transcript with timecodes")
+    transcript: Optional[str] = Field(None, description="Full transcript text (optional when video_id is given)")
+    transcript_with_timecodes: Optional[List[dict]] = Field(None, description="Transcript with timecodes (optional when video_id is given)")
+    video_id: Optional[str] = Field(None, description="ID from /api/process-video; the server reuses the transcript it already holds")
     guest_name: str = Field(..., description="Guest name")
     guest_title: str = Field(..., description="Guest title/position")
     guest_company: str = Field(..., description="Guest company")
@@ -1,20 +1,168 @@
+import asyncio
+import io
+import os
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+import math
+import re
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Any
 from services.openai_service import OpenAIService
-from services.prompts_service import PromptsService
+from services.llm_cache import LLMCache
+from services.prompts_service import (
+    CHAPTER_SAMPLE_LINES, PromptsService, canonicalize_whitespace, format_hms, get_prompts_service
+)
 from utils.cost_calculator import calculate_token_cost
+from utils.template_renderer import render_template
+from services.rate_limiter import estimate_tokens
 from database.repository import Repository
 from sqlalchemy.ext.asyncio import AsyncSession
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json parses the same payloads, just slower
+    import json
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Shape each field takes in a JSON-mode (response_format=json_object) response.
+# List fields come back as real arrays, so the regex/line parsers are only needed
+# for the plain-text path.
+JSON_FIELD_SCHEMAS = {
+    'youtube_summary': 'string',
+    'blog_post': 'string',
+    'clickbait_titles': 'array of strings',
+    'two_line_summary': 'string',
+    'quotes': 'array of strings',
+    'chapter_timestamps': 'array of objects {"start_seconds": int, "title": string}',
+    'linkedin_post': 'string',
+    'keywords': 'string',
+}
+
+# Seed for extractive parts (chapters, keywords) run at temperature 0, so reruns repeat on non-reasoning
+# models (reasoning models ignore temperature)
+DETERMINISTIC_SEED = 42
+
+# Prompt inputs, completion budget and temperature per part for Batch API submissions (BATCH_MODE=1)
+BATCH_PART_SPECS = {
+    'youtube_summary': (('transcript', 'guest_name', 'guest_title', 'guest_company'), 600, 0.7),
+    'blog_post': (('transcript', 'guest_name', 'guest_title', 'guest_company', 'guest_linkedin'), 2500, 0.7),
+    'clickbait_titles': (('transcript', 'guest_name', 'guest_company'), 800, 0.8),
+    'two_line_summary': (('transcript',), 200, 0.7),
+    'quotes': (('transcript_with_timecodes',), 1000, 0.6),
+    'chapter_timestamps': (('transcript_with_timecodes', 'video_duration'), 600, 0.0),
+    'linkedin_post': (('transcript', 'guest_name', 'guest_title', 'guest_company', 'guest_linkedin'), 800, 0.7),
+    'keywords': (('transcript', 'guest_name', 'guest_title', 'guest_company'), 200, 0.0),
+}
+
+# Short generations that can share one JSON-mode request when BATCH_GENERATIONS=1
+BUNDLE_FIELDS = ['two_line_summary', 'keywords', 'clickbait_titles']
+BUNDLE_PROMPT = """<transcript>
+{transcript}
+</transcript>
+
+You are writing short-form content for The Dollar Diaries podcast episode featuring {guest_name}, {guest_title} at {guest_company}, based ONLY on the transcript above.
+
+Return a JSON object with exactly these fields:
+{fields}
+
+Requirements:
+- two_line_summary: a concise summary of the episode, at most two lines
+- keywords: lowercase comma-separated keywords separated by ', ', MUST include 'thedollardiaries', 'tdd', 'dubai', '{guest_name}', '{guest_company}', '{guest_title}'; at most 500 characters total and no trailing ellipsis
+- clickbait_titles: exactly 20 compelling titles, each under 100 characters, mentioning {guest_name} and/or {guest_company}
+
+Return only the JSON object."""
+
+def _strip_list_marker(line: str) -> str:
+    """Strip a leading bullet ("-", "•") or number marker ("1.", "12)") in a single pass"""
+    i, n = 0, len(line)
+    while i < n and line[i].isspace():
+        i += 1
+    if i < n and line[i] in '-•':
+        i += 1
+    else:
+        j = i
+        while j < n and line[j].isdigit():
+            j += 1
+        if j > i and j < n and line[j] in '.)':
+            i = j + 1
+    while i < n and line[i].isspace():
+        i += 1
+    return line[i:].rstrip()
+
+
+_NUMBERED = re.compile(r'^\s*\d+\s*[.)]\s*(.*\S)\s*$')
+
+
+def _parse_numbered_line(line: str) -> str:
+    """Return the item text of a numbered or bulleted list line"""
+    m = _NUMBERED.match(line)
+    return m.group(1) if m else _strip_list_marker(line)
+
+
+def _iter_numbered(text: str, max_len: Optional[int] = None) -> Iterator[str]:
+    """Yield list items from text, skipping blanks and items longer than max_len"""
+    for line in text.splitlines():
+        item = _parse_numbered_line(line)
+        if item and (max_len is None or len(item) <= max_len):
+            yield item
+
+
+def _parse_numbered_lines(text: str, max_items: int, max_len: Optional[int] = None) -> List[str]:
+    """Parse up to max_items list items from text, skipping items longer than max_len"""
+    return list(islice(_iter_numbered(text, max_len), max_items))
+
+
+# Hardcoded completion budget per task; also the ceiling for tuned budgets
+DEFAULT_TASK_MAX_TOKENS = {
+    'youtube_summary': 600,
+    'blog_post': 2500,
+    'clickbait_titles': 800,
+    'two_line_summary': 200,
+    'quotes': 1000,
+    'chapter_timestamps': 600,
+    'linkedin_post': 800,
+    'keywords': 200,
+}
+
+# Safety floor for tuned budgets so a run of short completions can't starve a task
+# (e.g. 20 clickbait titles always need ~400 tokens)
+MIN_TASK_MAX_TOKENS = {
+    'youtube_summary': 300,
+    'blog_post': 1500,
+    'clickbait_titles': 400,
+    'two_line_summary': 100,
+    'quotes': 500,
+    'chapter_timestamps': 300,
+    'linkedin_post': 400,
+    'keywords': 150,
+}
+
+# Tuned budgets (ceil(p95 * 1.2) of historical completions), refreshed by the scheduler
+TASK_MAX_TOKENS: Dict[str, int] = {}
+
+
+async def refresh_task_max_tokens(repository: Repository) -> Dict[str, int]:
+    """Re-tune TASK_MAX_TOKENS from p95 completion lengths in token_usage"""
+    for prompt_name, default in DEFAULT_TASK_MAX_TOKENS.items():
+        p95 = await repository.get_p95_completion_tokens(prompt_name)
+        if not p95:
+            continue
+        budget = min(default, math.ceil(p95 * 1.2))
+        TASK_MAX_TOKENS[prompt_name] = max(MIN_TASK_MAX_TOKENS[prompt_name], budget)
+    return dict(TASK_MAX_TOKENS)
+
+
 class ContentGenerator:
     def __init__(self, openai_service: OpenAIService, prompts_service: PromptsService = None, 
                  repository: Optional[Repository] = None, db_session: Optional[AsyncSession] = None):
         self.openai = openai_service
-        self.prompts_service = prompts_service or PromptsService()
+        self.prompts_service = prompts_service or get_prompts_service()
         self.repository = repository
         self.db_session = db_session
+        # The repository shares one AsyncSession, so concurrent generations take turns on it
+        self._db_lock = asyncio.Lock()
     
     # Database-integrated generation methods
     async def generate_all_content_with_db(
@@ -64,16 +212,38 @@ class ContentGenerator:
              {'transcript': transcript, 'guest_name': guest_name, 'guest_title': guest_title, 'guest_company': guest_company}),
         ]
         
-        for content_type, generator_func, params in content_types:
+        cache = self.openai.cache
+        
+        async def run(content_type, generator_func, params):
+            # Parts that already succeeded for this session with the same inputs are not regenerated
+            key = LLMCache.build_result_key(content_type, {**params, 'model': self.openai.model})
+            stored = await cache.get_result(session_id, content_type, key)
+            if stored:
+                logger.info(f"Reusing stored {content_type} for session {session_id}")
+                return {'content': stored['content'], 'prompt_tokens': 0, 'completion_tokens': 0,
+                        'total_tokens': 0, 'cost_usd': 0.0}
             try:
                 result = await generator_func(session_id, **params)
-                content_dict[content_type] = result['content']
-                total_prompt_tokens += result['prompt_tokens']
-                total_completion_tokens += result['completion_tokens']
-                total_cost += result['cost_usd']
             except Exception as e:
                 logger.error(f"Error generating {content_type}: {str(e)}", exc_info=True)
                 raise
+            await cache.set_result(session_id, content_type, key, result['content'], {
+                'prompt_tokens': result['prompt_tokens'],
+                'completion_tokens': result['completion_tokens'],
+                'cost_usd': result['cost_usd']
+            })
+            return result
+        
+        # Let every part finish (and persist) before surfacing the first failure
+        results = await asyncio.gather(*(run(*entry) for entry in content_types), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        for (content_type, _, _), result in zip(content_types, results):
+            content_dict[content_type] = result['content']
+            total_prompt_tokens += result['prompt_tokens']
+            total_completion_tokens += result['completion_tokens']
+            total_cost += result['cost_usd']
         
         # Generate hashtags from keywords
         content_dict['hashtags'] = self.generate_hashtags_from_keywords(content_dict.get('keywords', ''))
@@ -140,8 +310,8 @@ class ContentGenerator:
         result = await self._generate_content_with_db('chapter_timestamps', session_id,
                                                       transcript_with_timecodes=transcript_with_timecodes,
                                                       video_duration=video_duration,
-                                                      max_tokens=600, temperature=0.7,
-                                                      parse_timestamps=True)
+                                                      max_tokens=600, temperature=0.0,
+                                                      seed=DETERMINISTIC_SEED, parse_timestamps=True)
         return result
     
     async def _generate_linkedin_post_with_db_impl(self, session_id: str, transcript: str,
@@ -157,19 +327,11 @@ class ContentGenerator:
                                                guest_name: str, guest_title: str, guest_company: str) -> Dict:
         """Generate keywords with DB persistence"""
         result = await self._generate_content_with_db('keywords', session_id,
-                                                      transcript=transcript, max_tokens=200, temperature=0.5,
-                                                      guest_name=guest_name, guest_title=guest_title,
-                                                      guest_company=guest_company)
+                                                      transcript=transcript, max_tokens=200, temperature=0.0,
+                                                      seed=DETERMINISTIC_SEED, guest_name=guest_name,
+                                                      guest_title=guest_title, guest_company=guest_company)
         # Truncate to 500 chars max
-        keywords = result['content'].strip().rstrip('...')
-        if len(keywords) > 500:
-            truncated = keywords[:500]
-            last_comma = truncated.rfind(',')
-            if last_comma > 400:
-                keywords = truncated[:last_comma]
-            else:
-                keywords = truncated
-        result['content'] = keywords.strip()
+        result['content'] = self._truncate_keywords(result['content'])
         return result
     
     async def _generate_content_with_db(self, prompt_name: str, session_id: str,
@@ -177,12 +339,16 @@ class ContentGenerator:
                                         transcript_with_timecodes: Optional[List[dict]] = None,
                                         video_duration: Optional[float] = None,
                                         max_tokens: int = 500, temperature: float = 0.7,
+                                        seed: Optional[int] = None,
                                         parse_list: bool = False, parse_timestamps: bool = False,
                                         default_items: int = 0, default_item: str = "",
                                         **format_kwargs) -> Dict:
         """Generic method to generate content with DB persistence"""
+        max_tokens = TASK_MAX_TOKENS.get(prompt_name, max_tokens)
+        
         # Get prompt template
-        template = await self.repository.get_prompt_template(prompt_name)
+        async with self._db_lock:
+            template = await self.repository.get_prompt_template(prompt_name)
         if not template:
             logger.warning(f"Prompt template not found: {prompt_name}, using fallback")
             prompt_text = f"Generate {prompt_name}"
@@ -199,7 +365,7 @@ class ContentGenerator:
             
             # Render prompt
             try:
-                prompt_text = template.template.format(**fmt_kwargs)
+                prompt_text = canonicalize_whitespace(render_template(template.template, fmt_kwargs))
             except KeyError as e:
                 logger.warning(f"Could not format prompt template {prompt_name}: {e}")
                 prompt_text = template.template
@@ -207,12 +373,27 @@ class ContentGenerator:
             template_id = template.id
         
         # Save prompt usage BEFORE calling OpenAI
-        prompt_usage = await self.repository.save_prompt_usage(session_id, template_id, prompt_text)
+        async with self._db_lock:
+            prompt_usage = await self.repository.save_prompt_usage(session_id, template_id, prompt_text)
+        
+        # Call OpenAI, parsing list/timestamp lines as they stream in
+        items: List[str] = []
+        on_line = None
+        if parse_list:
+            def on_line(line: str):
+                item = _parse_numbered_line(line)
+                if item:
+                    items.append(item)
+        elif parse_timestamps:
+            def on_line(line: str):
+                line = line.strip()
+                if ' - ' in line:
+                    items.append(line)
         
-        # Call OpenAI
-        result = await self.openai.generate_text_with_tokens(prompt_text, max_tokens=max_tokens, temperature=temperature)
+        # Stop once enough list items have arrived instead of paying for the rest of the completion
+        stop = (lambda: len(items) >= default_items) if parse_list and default_items else None
+        response_text, result = await self._stream_text(prompt_text, max_tokens, temperature, on_line, stop, seed)
         
-        response_text = result['content']
         prompt_tokens = result.get('prompt_tokens', 0)
         completion_tokens = result.get('completion_tokens', 0)
         total_tokens = result.get('total_tokens', 0)
@@ -221,24 +402,23 @@ class ContentGenerator:
         cost_usd = calculate_token_cost(prompt_tokens, completion_tokens, self.openai.model)
         
         # Save token usage AFTER OpenAI call
-        await self.repository.save_token_usage(
-            session_id=session_id,
-            prompt_usage_id=prompt_usage.id,
-            template_id=template_id,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-            model=self.openai.model,
-            cost_usd=cost_usd
-        )
+        async with self._db_lock:
+            await self.repository.save_token_usage(
+                session_id=session_id,
+                prompt_usage_id=prompt_usage.id,
+                template_id=template_id,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                model=self.openai.model,
+                cost_usd=cost_usd
+            )
         
-        # Parse response if needed
+        # Finish parsing if needed
         if parse_list:
-            items = self._parse_list_response(response_text, default_items, default_item)
-            content = items
+            content = self._pad_items(items, default_items, default_item)
         elif parse_timestamps:
-            timestamps = self._parse_timestamps_response(response_text)
-            content = timestamps
+            content = self._sort_timestamps(items)
         else:
             content = response_text
         
@@ -251,27 +431,72 @@ class ContentGenerator:
             'model': self.openai.model
         }
     
+    async def _stream_text(self, prompt: str, max_tokens: int, temperature: float,
+                           on_line: Optional[Callable[[str], None]] = None,
+                           stop: Optional[Callable[[], bool]] = None,
+                           seed: Optional[int] = None) -> Tuple[str, Dict]:
+        """Stream a completion, handing each complete line to on_line as it arrives.
+
+        When stop() turns true the stream is closed early; usage is then estimated locally
+        since the final usage chunk never arrives.
+        """
+        buffer = io.StringIO()
+        pending = ""
+        usage: Dict = {}
+        aborted = False
+        chunks = self.openai.stream_text_with_tokens(prompt, max_tokens=max_tokens, temperature=temperature, seed=seed)
+        try:
+            async for delta, final_usage in chunks:
+                if final_usage:
+                    usage = final_usage
+                if not delta:
+                    continue
+                buffer.write(delta)
+                if on_line:
+                    pending += delta
+                    if '\n' in pending:
+                        *lines, pending = pending.split('\n')
+                        for line in lines:
+                            on_line(line)
+                if stop and stop():
+                    aborted = True
+                    break
+        finally:
+            await chunks.aclose()
+        if on_line and pending and not aborted:
+            on_line(pending)
+        text = buffer.getvalue().strip()
+        if aborted and not usage:
+            prompt_tokens = estimate_tokens(self.openai.model, prompt)
+            completion_tokens = estimate_tokens(self.openai.model, text)
+            usage = {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'model': self.openai.model
+            }
+        return text, usage
+    
+    def _pad_items(self, items: List[str], target_count: int = 20, default_item: str = "") -> List[str]:
+        """Trim or pad parsed list items with default_item to target_count"""
+        del items[target_count:]
+        if default_item:
+            items.extend([default_item] * (target_count - len(items)))
+        return items
+    
+    def _sort_timestamps(self, timestamps: List[str]) -> List[str]:
+        """Sort 'HH:MM:SS - Title' lines by time, parsing each timestamp once"""
+        decorated = [(self._parse_timestamp(line.partition(' - ')[0]), i, line) for i, line in enumerate(timestamps)]
+        decorated.sort()
+        timestamps = [line for _, _, line in decorated]
+        
+        return timestamps if timestamps else ["00:00:00 - Introduction"]
+    
     def _parse_list_response(self, response: str, target_count: int = 20, default_item: str = "") -> List[str]:
         """Parse numbered/bulleted list from response"""
-        items = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            # Remove numbering
-            if line and line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                line = line.split('.', 1)[-1].strip() if '.' in line[:3] else line.split(')', 1)[-1].strip()
-            # Remove bullet points
-            if line.startswith('-') or line.startswith('•'):
-                line = line[1:].strip()
-            if line:
-                items.append(line)
+        items = _parse_numbered_lines(response, target_count)
         
-        # Pad to target count
-        while len(items) < target_count and default_item:
-            items.append(default_item)
-        
-        return items[:target_count]
+        return self._pad_items(items, target_count, default_item)
     
     def _parse_timestamps_response(self, response: str) -> List[str]:
         """Parse timestamps from response"""
@@ -281,10 +506,110 @@ class ContentGenerator:
             if line and ' - ' in line:
                 timestamps.append(line)
         
-        # Sort by time
-        timestamps.sort(key=lambda x: self._parse_timestamp(x.split(' - ')[0]))
+        return self._sort_timestamps(timestamps)
+    
+    def _parse_json_response(self, response_text: str, fields: List[str]) -> Dict:
+        """Parse a JSON-mode response and fan the requested fields out directly"""
+        payload = _loads(response_text)
+        content = {}
+        for field in fields:
+            if field not in payload:
+                continue
+            value = payload[field]
+            if field == 'chapter_timestamps':
+                # Structured chapters: sort on the int and format once, no string splitting
+                value = [
+                    f"{self._format_timestamp(ch['start_seconds'])} - {ch['title']}"
+                    for ch in sorted(value, key=lambda ch: ch['start_seconds'])
+                ] or ["00:00:00 - Introduction"]
+            content[field] = value
+        return content
+    
+    async def generate_all_for_episode(self, episode: Dict) -> Tuple[Dict, Dict]:
+        """Generate all content for one episode dict holding generate_all_content's arguments"""
+        params = {k: v for k, v in episode.items() if k != 'episode_id'}
+        return await self.generate_all_content(**params)
+    
+    async def generate_all_for_episodes(self, episodes: List[Dict]) -> List[Tuple[Dict, Dict]]:
+        """Generate content for several episodes concurrently, in input order.
+
+        MAX_CONCURRENT_EPISODES bounds how many transcripts are in flight at once;
+        the OpenAI service's rate limiter still paces the requests themselves.
+        With BATCH_MODE=1 everything goes through the Batch API instead.
+        """
+        if os.getenv("BATCH_MODE") == "1":
+            return await self.generate_all_batch(episodes)
+        
+        semaphore = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_EPISODES", "3")))
         
-        return timestamps if timestamps else ["00:00:00 - Introduction"]
+        async def run(episode: Dict) -> Tuple[Dict, Dict]:
+            async with semaphore:
+                return await self.generate_all_for_episode(episode)
+        
+        return await asyncio.gather(*(run(episode) for episode in episodes))
+    
+    async def generate_all_batch(self, episodes: List[Dict]) -> List[Tuple[Dict, Dict]]:
+        """Generate content for many episodes through the OpenAI Batch API (cheaper, up to 24h turnaround).
+
+        Each episode dict holds generate_all_content's arguments plus an optional episode_id;
+        parsed parts are persisted per episode as results arrive.
+        """
+        requests = []
+        for index, episode in enumerate(episodes):
+            episode_id = episode.get('episode_id') or str(index)
+            params = {'video_duration': 0, **episode}
+            for part, (fields, max_tokens, temperature) in BATCH_PART_SPECS.items():
+                requests.append({
+                    'custom_id': f"{episode_id}:{part}",
+                    'prompt': self.prompts_service.format_prompt(part, **{f: params[f] for f in fields}),
+                    'max_tokens': TASK_MAX_TOKENS.get(part, max_tokens),
+                    'temperature': temperature,
+                    'seed': DETERMINISTIC_SEED if temperature == 0 else None
+                })
+        
+        batch_id = await self.openai.generate_batch(requests)
+        results = await self.openai.wait_for_batch(batch_id)
+        
+        outputs = []
+        for index, episode in enumerate(episodes):
+            episode_id = episode.get('episode_id') or str(index)
+            params = {'video_duration': 0, **episode}
+            content = {}
+            prompt_tokens = completion_tokens = 0
+            for part, (fields, _, _) in BATCH_PART_SPECS.items():
+                result = results.get(f"{episode_id}:{part}")
+                if result is None:
+                    logger.warning(f"No batch result for {episode_id}/{part}; using defaults")
+                content[part] = self._finalize_part(part, result['content'] if result else "", params)
+                if result:
+                    prompt_tokens += result['prompt_tokens']
+                    completion_tokens += result['completion_tokens']
+                    key = LLMCache.build_result_key(part, {**{f: params[f] for f in fields}, 'model': self.openai.model})
+                    await self.openai.cache.set_result(episode_id, part, key, content[part], {
+                        'prompt_tokens': result['prompt_tokens'],
+                        'completion_tokens': result['completion_tokens']
+                    })
+            content['hashtags'] = self.generate_hashtags_from_keywords(content['keywords'])
+            outputs.append((content, {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'model': self.openai.model
+            }))
+        return outputs
+    
+    def _finalize_part(self, part: str, text: str, params: Dict) -> Any:
+        """Apply the same post-processing the per-part generators use to raw completion text"""
+        if part == 'clickbait_titles':
+            titles = _parse_numbered_lines(text, 20, max_len=100)
+            return self._pad_items(titles, 20, f"Insights from {params['guest_name']} at {params['guest_company']}")
+        if part == 'quotes':
+            return self._pad_items(_parse_numbered_lines(text, 20), 20, "Notable insight from the episode")
+        if part == 'chapter_timestamps':
+            return self._parse_timestamps_response(text)
+        if part == 'keywords':
+            return self._truncate_keywords(text)
+        return text
     
     # Original methods preserved for backward compatibility
     async def generate_all_content(
@@ -307,58 +632,27 @@ class ContentGenerator:
         total_tokens = 0
         model_used = self.openai.model
         
-        # Generate all content sequentially and track tokens
-        youtube_summary, tokens1 = await self._generate_youtube_summary_with_tokens(
-            transcript, guest_name, guest_title, guest_company
-        )
-        total_prompt_tokens += tokens1.get("prompt_tokens", 0)
-        total_completion_tokens += tokens1.get("completion_tokens", 0)
-        total_tokens += tokens1.get("total_tokens", 0)
-        
-        blog_post, tokens2 = await self._generate_blog_post_with_tokens(
-            transcript, guest_name, guest_title, guest_company, guest_linkedin
-        )
-        total_prompt_tokens += tokens2.get("prompt_tokens", 0)
-        total_completion_tokens += tokens2.get("completion_tokens", 0)
-        total_tokens += tokens2.get("total_tokens", 0)
-        
-        clickbait_titles, tokens3 = await self._generate_clickbait_titles_with_tokens(
-            transcript, guest_name, guest_company
-        )
-        total_prompt_tokens += tokens3.get("prompt_tokens", 0)
-        total_completion_tokens += tokens3.get("completion_tokens", 0)
-        total_tokens += tokens3.get("total_tokens", 0)
-        
-        two_line_summary, tokens4 = await self._generate_two_line_summary_with_tokens(transcript)
-        total_prompt_tokens += tokens4.get("prompt_tokens", 0)
-        total_completion_tokens += tokens4.get("completion_tokens", 0)
-        total_tokens += tokens4.get("total_tokens", 0)
-        
-        quotes, tokens5 = await self._generate_quotes_with_tokens(transcript_with_timecodes)
-        total_prompt_tokens += tokens5.get("prompt_tokens", 0)
-        total_completion_tokens += tokens5.get("completion_tokens", 0)
-        total_tokens += tokens5.get("total_tokens", 0)
-        
-        chapter_timestamps, tokens6 = await self._generate_chapter_timestamps_with_tokens(
-            transcript_with_timecodes, video_duration
-        )
-        total_prompt_tokens += tokens6.get("prompt_tokens", 0)
-        total_completion_tokens += tokens6.get("completion_tokens", 0)
-        total_tokens += tokens6.get("total_tokens", 0)
-        
-        linkedin_post, tokens7 = await self._generate_linkedin_post_with_tokens(
-            transcript, guest_name, guest_title, guest_company, guest_linkedin
-        )
-        total_prompt_tokens += tokens7.get("prompt_tokens", 0)
-        total_completion_tokens += tokens7.get("completion_tokens", 0)
-        total_tokens += tokens7.get("total_tokens", 0)
-        
-        keywords, tokens8 = await self._generate_keywords_with_tokens(
-            transcript, guest_name, guest_title, guest_company
+        # Generate all content concurrently and track tokens
+        (
+            (youtube_summary, tokens1),
+            (blog_post, tokens2),
+            (quotes, tokens5),
+            (chapter_timestamps, tokens6),
+            (linkedin_post, tokens7),
+            short_form,
+        ) = await asyncio.gather(
+            self._generate_youtube_summary_with_tokens(transcript, guest_name, guest_title, guest_company),
+            self._generate_blog_post_with_tokens(transcript, guest_name, guest_title, guest_company, guest_linkedin),
+            self._generate_quotes_with_tokens(transcript_with_timecodes),
+            self._generate_chapter_timestamps_with_tokens(transcript_with_timecodes, video_duration),
+            self._generate_linkedin_post_with_tokens(transcript, guest_name, guest_title, guest_company, guest_linkedin),
+            self._generate_short_form_with_tokens(transcript, guest_name, guest_title, guest_company),
         )
-        total_prompt_tokens += tokens8.get("prompt_tokens", 0)
-        total_completion_tokens += tokens8.get("completion_tokens", 0)
-        total_tokens += tokens8.get("total_tokens", 0)
+        two_line_summary, keywords, clickbait_titles, short_form_tokens = short_form
+        for tokens in (tokens1, tokens2, tokens5, tokens6, tokens7, *short_form_tokens):
+            total_prompt_tokens += tokens.get("prompt_tokens", 0)
+            total_completion_tokens += tokens.get("completion_tokens", 0)
+            total_tokens += tokens.get("total_tokens", 0)
         
         # Generate hashtags from keywords (add # prefix to each keyword)
         hashtags = self.generate_hashtags_from_keywords(keywords)
@@ -428,22 +722,10 @@ class ContentGenerator:
         response = await self.openai.generate_text(prompt, max_tokens=800, temperature=0.8)
         
         # Parse titles from response
-        titles = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and len(line) > 0:
-                # Remove numbering if present
-                if line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                    line = line.split('.', 1)[-1].strip()
-                    line = line.split(')', 1)[-1].strip()
-                if line and len(line) <= 100:
-                    titles.append(line)
+        titles = _parse_numbered_lines(response, 20, max_len=100)
         
         # Ensure we have exactly 20 titles
-        while len(titles) < 20:
-            titles.append(f"Insights from {guest_name} at {guest_company}")
-        
-        return titles[:20]
+        return self._pad_items(titles, 20, f"Insights from {guest_name} at {guest_company}")
     
     async def generate_two_line_summary(self, transcript: str) -> str:
         """Generate a two-line summary of the episode"""
@@ -464,22 +746,10 @@ class ContentGenerator:
         response = await self.openai.generate_text(prompt, max_tokens=1000, temperature=0.6)
         
         # Parse quotes from response
-        quotes = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and len(line) > 0:
-                # Remove numbering if present
-                if line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                    line = line.split('.', 1)[-1].strip()
-                    line = line.split(')', 1)[-1].strip()
-                if line:
-                    quotes.append(line)
+        quotes = _parse_numbered_lines(response, 20)
         
         # Ensure we have exactly 20 quotes
-        while len(quotes) < 20:
-            quotes.append("Notable insight from the episode")
-        
-        return quotes[:20]
+        return self._pad_items(quotes, 20, "Notable insight from the episode")
     
     async def generate_linkedin_post(
         self, transcript: str, guest_name: str, guest_title: str, guest_company: str, guest_linkedin: str
@@ -507,17 +777,17 @@ class ContentGenerator:
             guest_company=guest_company,
             transcript=transcript
         )
-        keywords = await self.openai.generate_text(prompt, max_tokens=200, temperature=0.5)
+        keywords = await self.openai.generate_text(prompt, max_tokens=200, temperature=0.0)
         # Ensure it doesn't exceed 500 characters (remove trailing ... if present)
-        keywords = keywords.strip().rstrip('...')
+        return self._truncate_keywords(keywords)
+    
+    def _truncate_keywords(self, keywords: str) -> str:
+        """Strip trailing ellipsis and cap keywords at 500 characters"""
+        keywords = keywords.strip(' .\t\n')
         if len(keywords) > 500:
-            # Truncate at last comma before 500 chars to avoid breaking keywords
-            truncated = keywords[:500]
-            last_comma = truncated.rfind(',')
-            if last_comma > 400:  # Only truncate at comma if it's reasonable
-                keywords = truncated[:last_comma]
-            else:
-                keywords = truncated
+            # Truncate at last comma before 500 chars (if reasonably late) to avoid breaking keywords
+            cut = keywords.rfind(',', 400, 500)
+            keywords = keywords[:cut if cut >= 400 else 500]
         return keywords.strip()
     
     def generate_hashtags_from_keywords(self, keywords: str) -> str:
@@ -552,45 +822,31 @@ class ContentGenerator:
         
         response = await self.openai.generate_text(prompt, max_tokens=600, temperature=0.7)
         
-        # Parse timestamps
-        timestamps = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and ' - ' in line:
-                timestamps.append(line)
-        
-        # Sort timestamps by time if needed
-        timestamps.sort(key=lambda x: self._parse_timestamp(x.split(' - ')[0]))
-        
-        return timestamps if timestamps else ["00:00:00 - Introduction"]
+        # Parse timestamps and sort them by time
+        return self._parse_timestamps_response(response)
     
     def _format_timestamp(self, seconds: float) -> str:
         """Format seconds to HH:MM:SS"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+        return format_hms(int(seconds))
     
     def _parse_timestamp(self, timestamp_str: str) -> int:
         """Parse HH:MM:SS to total seconds"""
         try:
-            parts = timestamp_str.split(':')
-            if len(parts) == 3:
-                return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-            elif len(parts) == 2:
-                return int(parts[0]) * 60 + int(parts[1])
-            else:
-                return int(parts[0])
-        except:
+            parts = list(map(int, timestamp_str.split(':')))
+        except ValueError:
             return 0
+        if len(parts) == 3:
+            return parts[0] * 3600 + parts[1] * 60 + parts[2]
+        if len(parts) == 2:
+            return parts[0] * 60 + parts[1]
+        return parts[0]
     
     def _format_transcript_for_chapters(self, transcript_with_timecodes: List[dict]) -> str:
-        """Format transcript for chapter generation"""
-        lines = []
-        for tc in transcript_with_timecodes[::10]:  # Sample every 10th entry for efficiency
-            timestamp = self._format_timestamp(tc['start'])
-            lines.append(f"[{timestamp}] {tc['text']}")
-        return "\n".join(lines)
+        """Format transcript for chapter generation, sampled evenly to at most CHAPTER_SAMPLE_LINES lines"""
+        # Ceiling division so the sample reaches the end of the episode
+        stride = max(1, -(-len(transcript_with_timecodes) // CHAPTER_SAMPLE_LINES))
+        sampled = transcript_with_timecodes[::stride][:CHAPTER_SAMPLE_LINES]
+        return "\n".join(f"[{self._format_timestamp(tc['start'])}] {tc['text']}" for tc in sampled)
     
     # Helper methods with token tracking
     async def _generate_youtube_summary_with_tokens(self, transcript: str, guest_name: str, guest_title: str, guest_company: str):
@@ -626,26 +882,86 @@ class ContentGenerator:
             guest_company=guest_company,
             transcript=transcript
         )
-        result = await self.openai.generate_text_with_tokens(prompt, max_tokens=800, temperature=0.8)
-        response = result['content']
-        
-        # Parse titles from response
-        titles = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and len(line) > 0:
-                # Remove numbering if present
-                if line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                    line = line.split('.', 1)[-1].strip()
-                    line = line.split(')', 1)[-1].strip()
-                if line and len(line) <= 100:
-                    titles.append(line)
+        # Parse titles as they stream in and stop once 20 have arrived
+        titles: List[str] = []
+        def on_line(line: str):
+            item = _parse_numbered_line(line)
+            if item and len(item) <= 100:
+                titles.append(item)
+        response, result = await self._stream_text(prompt, 800, 0.8, on_line, stop=lambda: len(titles) >= 20)
+        result['content'] = response
         
         # Ensure we have exactly 20 titles
-        while len(titles) < 20:
-            titles.append(f"Insights from {guest_name} at {guest_company}")
+        return self._pad_items(titles, 20, f"Insights from {guest_name} at {guest_company}"), result
+    
+    async def _generate_short_form_with_tokens(self, transcript: str, guest_name: str, guest_title: str, guest_company: str):
+        """Generate two-line summary, keywords and titles; one bundled request when BATCH_GENERATIONS=1"""
+        if os.getenv("BATCH_GENERATIONS") == "1":
+            return await self._generate_bundle_with_tokens(transcript, guest_name, guest_title, guest_company)
+        (
+            (titles, tokens3),
+            (two_line_summary, tokens4),
+            (keywords, tokens8),
+        ) = await asyncio.gather(
+            self._generate_clickbait_titles_with_tokens(transcript, guest_name, guest_company),
+            self._generate_two_line_summary_with_tokens(transcript),
+            self._generate_keywords_with_tokens(transcript, guest_name, guest_title, guest_company),
+        )
+        return two_line_summary, keywords, titles, [tokens3, tokens4, tokens8]
+    
+    async def _generate_bundle_with_tokens(self, transcript: str, guest_name: str, guest_title: str, guest_company: str):
+        """Generate two-line summary, keywords and titles in one JSON-mode request.
+
+        Fields that are missing, mistyped or unparseable are generated by their own request instead.
+        """
+        fields = "\n".join(f"- {field}: {JSON_FIELD_SCHEMAS[field]}" for field in BUNDLE_FIELDS)
+        prompt = canonicalize_whitespace(BUNDLE_PROMPT.format(
+            transcript=transcript,
+            guest_name=guest_name,
+            guest_title=guest_title,
+            guest_company=guest_company,
+            fields=fields
+        ))
+        result = await self.openai.generate_text_with_tokens(
+            prompt, max_tokens=1200, temperature=0.7, response_format={"type": "json_object"}
+        )
+        try:
+            content = self._parse_json_response(result['content'], BUNDLE_FIELDS)
+        except (ValueError, TypeError) as e:
+            # Truncated or malformed JSON (both decoders raise ValueError subclasses), or a non-object payload
+            logger.warning(f"Bundled short-form response could not be parsed: {e}")
+            content = {}
+        
+        two_line_summary = content.get('two_line_summary')
+        two_line_summary = two_line_summary.strip() if isinstance(two_line_summary, str) else ''
+        keywords = content.get('keywords')
+        keywords = self._truncate_keywords(keywords) if isinstance(keywords, str) and keywords.strip() else ''
+        titles = content.get('clickbait_titles') if isinstance(content.get('clickbait_titles'), list) else []
+        titles = list(islice((t for t in (t.strip() for t in titles if isinstance(t, str)) if t and len(t) <= 100), 20))
+        
+        fallbacks = {}
+        if not two_line_summary:
+            fallbacks['two_line_summary'] = self._generate_two_line_summary_with_tokens(transcript)
+        if not keywords:
+            fallbacks['keywords'] = self._generate_keywords_with_tokens(transcript, guest_name, guest_title, guest_company)
+        if not titles:
+            fallbacks['clickbait_titles'] = self._generate_clickbait_titles_with_tokens(transcript, guest_name, guest_company)
+        else:
+            self._pad_items(titles, 20, f"Insights from {guest_name} at {guest_company}")
+        
+        tokens = [result]
+        if fallbacks:
+            logger.info(f"Generating {', '.join(fallbacks)} separately after the bundled request")
+            for field, (value, field_tokens) in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+                tokens.append(field_tokens)
+                if field == 'two_line_summary':
+                    two_line_summary = value
+                elif field == 'keywords':
+                    keywords = value
+                else:
+                    titles = value
         
-        return titles[:20], result
+        return two_line_summary, keywords, titles, tokens
     
     async def _generate_two_line_summary_with_tokens(self, transcript: str):
         """Generate two-line summary with token tracking"""
@@ -662,26 +978,17 @@ class ContentGenerator:
             'quotes',
             transcript_with_timecodes=transcript_with_timecodes
         )
-        result = await self.openai.generate_text_with_tokens(prompt, max_tokens=1000, temperature=0.6)
-        response = result['content']
-        
-        # Parse quotes from response
-        quotes = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and len(line) > 0:
-                # Remove numbering if present
-                if line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                    line = line.split('.', 1)[-1].strip()
-                    line = line.split(')', 1)[-1].strip()
-                if line:
-                    quotes.append(line)
+        # Parse quotes as they stream in and stop once 20 have arrived
+        quotes: List[str] = []
+        def on_line(line: str):
+            item = _parse_numbered_line(line)
+            if item:
+                quotes.append(item)
+        response, result = await self._stream_text(prompt, 1000, 0.6, on_line, stop=lambda: len(quotes) >= 20)
+        result['content'] = response
         
         # Ensure we have exactly 20 quotes
-        while len(quotes) < 20:
-            quotes.append("Notable insight from the episode")
-        
-        return quotes[:20], result
+        return self._pad_items(quotes, 20, "Notable insight from the episode"), result
     
     async def _generate_chapter_timestamps_with_tokens(self, transcript_with_timecodes: List[dict], video_duration: float):
         """Generate chapter timestamps with token tracking"""
@@ -690,20 +997,12 @@ class ContentGenerator:
             transcript_with_timecodes=transcript_with_timecodes,
             video_duration=video_duration
         )
-        result = await self.openai.generate_text_with_tokens(prompt, max_tokens=600, temperature=0.7)
+        result = await self.openai.generate_text_with_tokens(prompt, max_tokens=600, temperature=0.0,
+                                                             seed=DETERMINISTIC_SEED)
         response = result['content']
         
-        # Parse timestamps
-        timestamps = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and ' - ' in line:
-                timestamps.append(line)
-        
-        # Sort timestamps by time if needed
-        timestamps.sort(key=lambda x: self._parse_timestamp(x.split(' - ')[0]))
-        
-        return timestamps if timestamps else ["00:00:00 - Introduction"], result
+        # Parse timestamps and sort them by time
+        return self._parse_timestamps_response(response), result
     
     async def _generate_linkedin_post_with_tokens(self, transcript: str, guest_name: str, guest_title: str, guest_company: str, guest_linkedin: str):
         """Generate LinkedIn post with token tracking"""
@@ -727,15 +1026,7 @@ class ContentGenerator:
             guest_company=guest_company,
             transcript=transcript
         )
-        result = await self.openai.generate_text_with_tokens(prompt, max_tokens=200, temperature=0.5)
-        keywords = result['content'].strip().rstrip('...')
-        if len(keywords) > 500:
-            # Truncate at last comma before 500 chars to avoid breaking keywords
-            truncated = keywords[:500]
-            last_comma = truncated.rfind(',')
-            if last_comma > 400:  # Only truncate at comma if it's reasonable
-                keywords = truncated[:last_comma]
-            else:
-                keywords = truncated
-        return keywords.strip(), result
+        result = await self.openai.generate_text_with_tokens(prompt, max_tokens=200, temperature=0.0,
+                                                             seed=DETERMINISTIC_SEED)
+        return self._truncate_keywords(result['content']), result
 
@@ -0,0 +1,129 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Completions at or below this temperature are treated as deterministic and cached by default
+CACHE_MAX_TEMPERATURE = 0.3
+
+
+class LLMCache:
+    """Exact-match SQLite cache for OpenAI completions"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Initialize cache; defaults to backend/data/llm_cache.db"""
+        if db_path is None:
+            db_path = os.getenv("LLM_CACHE_PATH")
+        if db_path is None:
+            data_dir = Path(__file__).parent.parent / "data"
+            data_dir.mkdir(exist_ok=True)
+            db_path = data_dir / "llm_cache.db"
+        self.db_path = str(db_path)
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def build_key(model: str, system_msg: str, prompt: str, max_tokens: int, temperature: float,
+                  response_format: Optional[Dict] = None, seed: Optional[int] = None) -> str:
+        """SHA256 over everything that determines the completion"""
+        fields = {"m": model, "s": system_msg, "u": prompt, "mt": max_tokens, "t": temperature}
+        # Only added when set, so keys for plain requests match the entries already stored
+        if response_format:
+            fields["rf"] = response_format
+        if seed is not None:
+            fields["seed"] = seed
+        payload = json.dumps(fields, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        async with self._lock:
+            if self._conn is None:
+                conn = await aiosqlite.connect(self.db_path)
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, content TEXT NOT NULL, usage TEXT NOT NULL, created_at TEXT NOT NULL)"
+                )
+                # Parsed per-episode parts, so a retry only regenerates the parts that failed
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "episode_id TEXT NOT NULL, part_name TEXT NOT NULL, key TEXT NOT NULL, "
+                    "content TEXT NOT NULL, usage TEXT NOT NULL, created_at TEXT NOT NULL, "
+                    "PRIMARY KEY (episode_id, part_name))"
+                )
+                await conn.commit()
+                self._conn = conn
+        return self._conn
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Return {'content', 'usage'} for a cached completion, or None"""
+        try:
+            conn = await self._connect()
+            async with conn.execute("SELECT content, usage FROM responses WHERE key = ?", (key,)) as cursor:
+                row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+        if row is None:
+            return None
+        return {'content': row[0], 'usage': json.loads(row[1])}
+
+    async def set(self, key: str, content: str, usage: Dict):
+        """Store a completion; failures are logged and ignored"""
+        try:
+            conn = await self._connect()
+            await conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, usage, created_at) VALUES (?, ?, ?, ?)",
+                (key, content, json.dumps(usage), datetime.now().isoformat())
+            )
+            await conn.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    @staticmethod
+    def build_result_key(part_name: str, inputs: Dict) -> str:
+        """SHA256 over a part's inputs; a stored part is only reused when they are unchanged"""
+        payload = json.dumps({"p": part_name, "i": inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get_result(self, episode_id: str, part_name: str, key: str) -> Optional[Dict]:
+        """Return {'content', 'usage'} for a stored part with matching inputs, or None"""
+        try:
+            conn = await self._connect()
+            async with conn.execute(
+                "SELECT content, usage FROM results WHERE episode_id = ? AND part_name = ? AND key = ?",
+                (episode_id, part_name, key)
+            ) as cursor:
+                row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"Result lookup failed for {episode_id}/{part_name}: {e}")
+            return None
+        if row is None:
+            return None
+        return {'content': json.loads(row[0]), 'usage': json.loads(row[1])}
+
+    async def set_result(self, episode_id: str, part_name: str, key: str, content: Any, usage: Dict):
+        """Store a generated part; failures are logged and ignored"""
+        try:
+            conn = await self._connect()
+            await conn.execute(
+                "INSERT OR REPLACE INTO results (episode_id, part_name, key, content, usage, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (episode_id, part_name, key, json.dumps(content), json.dumps(usage), datetime.now().isoformat())
+            )
+            await conn.commit()
+        except Exception as e:
+            logger.warning(f"Result write failed for {episode_id}/{part_name}: {e}")
+
+    async def close(self):
+        """Close the underlying connection"""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
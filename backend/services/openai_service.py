@@ -1,34 +1,120 @@
 import os
+import json
+import time
+import types
+import asyncio
 import logging
-from typing import Dict, Optional
-from openai import OpenAI
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import openai
+from openai import AsyncOpenAI
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from datetime import datetime, timedelta
+from services.llm_cache import LLMCache, CACHE_MAX_TEMPERATURE
+from services.rate_limiter import TokenBucket, estimate_tokens, get_encoding
 
 logger = logging.getLogger(__name__)
 
-# Safe prompt length for 16k-context models (~12.5k tokens); leave room for system message and output
+# Safe prompt length for 16k-context models (~12.5k tokens); only used when tiktoken is unavailable
 MAX_PROMPT_CHARS = 50_000
 TRUNCATION_NOTE = "\n\n[Transcript truncated due to length. Content generated from the first part of the episode.]"
+# Context window per model (tokens); prompts are truncated to this minus max_tokens and overhead
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-5": 400_000,
+    "gpt-5-mini": 400_000,
+    "gpt-5-nano": 400_000,
+    "gpt-5.1": 400_000,
+    "gpt-5.2": 400_000,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+}
+DEFAULT_CONTEXT_WINDOW = 16_385
+# Room for the system message and chat-format framing tokens
+SYSTEM_OVERHEAD_TOKENS = 200
+# Stand-in when a response carries no usage block
+_ZERO_USAGE = types.SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0, prompt_tokens_details=None)
+# Dashboard polling reuses the last key check for this long
+CREDIT_INFO_TTL_SECONDS = 60
+SYSTEM_PROMPT = "You are a professional content writer specializing in podcast summaries, blog posts, and marketing content."
+# Model families that take max_completion_tokens and no temperature
+REASONING_MODEL_PREFIXES = ("gpt-5", "o1", "o3", "o4")
+# Shared, byte-identical messages[0] for every request so OpenAI's prompt cache can match the prefix
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+# Batches run within a 24h completion window; allow an extra hour for finalizing before giving up
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_MAX_WAIT_SECONDS = 25 * 3600
 
 
-def _truncate_prompt(prompt: str, max_chars: int = MAX_PROMPT_CHARS) -> str:
-    """Truncate prompt to stay under context limit; append a note so the model knows."""
-    if len(prompt) <= max_chars:
+def _truncate_prompt(prompt: str, model: str, max_tokens: int) -> str:
+    """Truncate prompt to the model's token budget; append a note so the model knows."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        if len(prompt) <= MAX_PROMPT_CHARS:
+            return prompt
+        return prompt[: MAX_PROMPT_CHARS - len(TRUNCATION_NOTE)] + TRUNCATION_NOTE
+    budget = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW) - max_tokens - SYSTEM_OVERHEAD_TOKENS
+    tokens = encoding.encode(prompt)
+    if len(tokens) <= budget:
         return prompt
-    return prompt[: max_chars - len(TRUNCATION_NOTE)] + TRUNCATION_NOTE
+    return encoding.decode(tokens[: budget - len(encoding.encode(TRUNCATION_NOTE))]) + TRUNCATION_NOTE
+
+
+def _cached_prompt_tokens(usage) -> int:
+    """Prompt tokens served from OpenAI's automatic prefix cache"""
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    return (getattr(details, "cached_tokens", None) or 0) if details else 0
 
 
 def _is_context_length_error(error_msg: str) -> bool:
     return "context_length_exceeded" in error_msg or "maximum context length" in error_msg
 
 
+def _is_model_unavailable_error(error_msg: str) -> bool:
+    return "model_not_found" in error_msg or "does not have access" in error_msg
+
+
+def _is_account_error(error: BaseException) -> bool:
+    """Key or billing problems that no fallback model can get past; anything else may succeed on the next model"""
+    if isinstance(error, openai.RateLimitError):
+        return "insufficient_quota" in str(error)
+    return isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError))
+
+
+def _completion_params(model: str, max_tokens: int, temperature: float) -> Dict:
+    """Token limit and sampling arguments in the form the model accepts"""
+    if model.startswith(REASONING_MODEL_PREFIXES):
+        # Reasoning models reject max_tokens and only support the default temperature
+        return {'max_completion_tokens': max_tokens}
+    return {'max_tokens': max_tokens, 'temperature': temperature}
+
+
+def _is_transient_error(error: BaseException) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx are worth retrying; an exhausted quota is not"""
+    if isinstance(error, openai.RateLimitError):
+        return "insufficient_quota" not in str(error)
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError))
+
+
 class OpenAIService:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[LLMCache] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # SDK retries are disabled; _create_completion retries transient errors with jittered backoff
+        self.aclient = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        # Caps in-flight requests when content generations are fanned out concurrently
+        self._semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")))
+        self.cache = cache or LLMCache()
+        # Proactive throttling so batch runs stay under the account's rate limits instead of hitting 429s
+        self.rate_limiter = TokenBucket(
+            rpm=int(os.getenv("OPENAI_RPM", "500")),
+            tpm=int(os.getenv("OPENAI_TPM", "200000"))
+        )
+        self._credit_info_cache: Optional[Tuple[float, Dict]] = None
+        self._credit_info_lock = asyncio.Lock()
         # Default: gpt-5-mini if available; override via OPENAI_MODEL
         configured_model = os.getenv("OPENAI_MODEL", "gpt-5-mini")
         self.model = configured_model
@@ -40,99 +126,294 @@ class OpenAIService:
         
     async def generate_text(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> str:
         """Generate text using OpenAI API with automatic fallback and truncation on context limit."""
+        return await self._invoke(prompt, max_tokens, temperature, return_usage=False)
+    
+    async def generate_text_with_tokens(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7,
+                                        cache: Optional[bool] = None, response_format: Optional[Dict] = None,
+                                        seed: Optional[int] = None) -> Dict:
+        """Generate text and return both content and token usage; fallback models and truncate on context limit.
+
+        Low-temperature completions are served from the response cache; pass cache to override.
+        Pass response_format={"type": "json_object"} for JSON mode and seed for reproducible sampling.
+        """
+        return await self._invoke(prompt, max_tokens, temperature, return_usage=True,
+                                  cache=cache, response_format=response_format, seed=seed)
+    
+    async def _invoke(self, prompt: str, max_tokens: int, temperature: float, return_usage: bool,
+                      cache: Optional[bool] = None, response_format: Optional[Dict] = None,
+                      seed: Optional[int] = None):
+        """Shared cache/fallback/truncation loop; returns the usage dict or just the content"""
+        extra = {}
+        if response_format:
+            extra['response_format'] = response_format
+        if seed is not None:
+            extra['seed'] = seed
         models_to_try = [self.model] + [m for m in self.fallback_models if m != self.model]
         last_error = None
-        system_msg = "You are a professional content writer specializing in podcast summaries, blog posts, and marketing content."
+        use_cache = cache if cache is not None else temperature <= CACHE_MAX_TEMPERATURE
 
         for model_to_try in models_to_try:
             user_content = prompt
-            truncated = False
             for attempt in range(2):
-                try:
-                    response = self.client.chat.completions.create(
-                        model=model_to_try,
-                        messages=[
-                            {"role": "system", "content": system_msg},
-                            {"role": "user", "content": user_content}
-                        ],
-                        max_tokens=max_tokens,
-                        temperature=temperature
+                cache_key = None
+                if use_cache:
+                    cache_key = LLMCache.build_key(
+                        model_to_try, SYSTEM_PROMPT, user_content, max_tokens, temperature,
+                        response_format=response_format, seed=seed
                     )
+                    cached = await self.cache.get(cache_key)
+                    if cached:
+                        result = self._cached_result(cached, model_to_try)
+                        return result if return_usage else result['content']
+                try:
+                    response = await self._create_completion(model_to_try, user_content, max_tokens, temperature, **extra)
                     if model_to_try != self.model:
                         logger.info(f"Successfully used fallback model '{model_to_try}' instead of '{self.model}'")
-                    if truncated:
+                    if attempt == 1:
                         logger.info("Request succeeded after truncating prompt for context length.")
-                    return response.choices[0].message.content.strip()
+                    usage = response.usage or _ZERO_USAGE
+                    result = {
+                        'content': response.choices[0].message.content.strip(),
+                        'prompt_tokens': usage.prompt_tokens,
+                        'completion_tokens': usage.completion_tokens,
+                        'total_tokens': usage.total_tokens,
+                        'cached_tokens': _cached_prompt_tokens(usage),
+                        'model': model_to_try
+                    }
+                    if result['cached_tokens']:
+                        logger.info(f"Prompt cache hit: {result['cached_tokens']}/{result['prompt_tokens']} prompt tokens cached")
+                    if cache_key:
+                        await self.cache.set(cache_key, result['content'], {
+                            'prompt_tokens': result['prompt_tokens'],
+                            'completion_tokens': result['completion_tokens'],
+                            'total_tokens': result['total_tokens']
+                        })
+                    return result if return_usage else result['content']
                 except Exception as e:
                     error_msg = str(e)
                     last_error = e
-                    if _is_context_length_error(error_msg) and attempt == 0 and len(user_content) > MAX_PROMPT_CHARS:
-                        user_content = _truncate_prompt(user_content)
-                        truncated = True
+                    if _is_context_length_error(error_msg) and attempt == 0:
+                        truncated_content = _truncate_prompt(user_content, model_to_try, max_tokens)
+                        if truncated_content == user_content:
+                            # Already within this model's budget; a larger-context fallback may still fit
+                            break
+                        user_content = truncated_content
                         logger.warning("Context length exceeded; truncating prompt and retrying once.")
                         continue
-                    if "model_not_found" in error_msg or "does not have access" in error_msg:
+                    if _is_model_unavailable_error(error_msg):
                         logger.warning(f"Model '{model_to_try}' not available, trying fallback models...")
                         break
+                    if _is_account_error(e):
+                        self._raise_api_error(e, models_to_try)
+                    # Model-specific 400s, and 5xx or connection errors that outlasted the retries
+                    logger.warning(f"Model '{model_to_try}' failed ({error_msg}); trying fallback models...")
                     break
 
-        error_msg = str(last_error) if last_error else "Unknown error"
-        logger.error(f"Error generating text with OpenAI: {error_msg}", exc_info=True)
-        if "model_not_found" in error_msg or "does not have access" in error_msg:
-            raise Exception(f"OpenAI API error: None of the attempted models are available. Tried: {', '.join(models_to_try)}. Please set OPENAI_MODEL environment variable to a model your project has access to. Original error: {error_msg}")
-        raise Exception(f"OpenAI API error: {error_msg}")
+        self._raise_api_error(last_error, models_to_try)
     
-    async def generate_text_with_tokens(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> Dict:
-        """Generate text and return both content and token usage; fallback models and truncate on context limit."""
+    async def stream_text_with_tokens(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7,
+                                      cache: Optional[bool] = None,
+                                      seed: Optional[int] = None) -> AsyncIterator[Tuple[str, Optional[Dict]]]:
+        """Stream a completion as (delta, usage) pairs; usage is only set on the final chunk.
+
+        Fallback models and context-length truncation apply until the stream is opened.
+        A cache hit is yielded as a single chunk.
+        """
         models_to_try = [self.model] + [m for m in self.fallback_models if m != self.model]
         last_error = None
-        system_msg = "You are a professional content writer specializing in podcast summaries, blog posts, and marketing content."
+        use_cache = cache if cache is not None else temperature <= CACHE_MAX_TEMPERATURE
 
         for model_to_try in models_to_try:
             user_content = prompt
             for attempt in range(2):
+                cache_key = None
+                if use_cache:
+                    cache_key = LLMCache.build_key(
+                        model_to_try, SYSTEM_PROMPT, user_content, max_tokens, temperature, seed=seed
+                    )
+                    cached = await self.cache.get(cache_key)
+                    if cached:
+                        result = self._cached_result(cached, model_to_try)
+                        yield result.pop('content'), result
+                        return
                 try:
-                    response = self.client.chat.completions.create(
-                        model=model_to_try,
-                        messages=[
-                            {"role": "system", "content": system_msg},
-                            {"role": "user", "content": user_content}
-                        ],
-                        max_tokens=max_tokens,
-                        temperature=temperature
+                    stream = await self._create_completion(
+                        model_to_try, user_content, max_tokens, temperature,
+                        stream=True, stream_options={"include_usage": True},
+                        **({'seed': seed} if seed is not None else {})
                     )
-                    if model_to_try != self.model:
-                        logger.info(f"Successfully used fallback model '{model_to_try}' instead of '{self.model}'")
-                    if attempt == 1:
-                        logger.info("Request succeeded after truncating prompt for context length.")
-                    return {
-                        'content': response.choices[0].message.content.strip(),
-                        'tokens_used': response.usage.total_tokens if response.usage else 0,
-                        'prompt_tokens': response.usage.prompt_tokens if response.usage else 0,
-                        'completion_tokens': response.usage.completion_tokens if response.usage else 0,
-                        'total_tokens': response.usage.total_tokens if response.usage else 0,
-                        'model': model_to_try
-                    }
                 except Exception as e:
                     error_msg = str(e)
                     last_error = e
-                    if _is_context_length_error(error_msg) and attempt == 0 and len(user_content) > MAX_PROMPT_CHARS:
-                        user_content = _truncate_prompt(user_content)
+                    if _is_context_length_error(error_msg) and attempt == 0:
+                        truncated_content = _truncate_prompt(user_content, model_to_try, max_tokens)
+                        if truncated_content == user_content:
+                            # Already within this model's budget; a larger-context fallback may still fit
+                            break
+                        user_content = truncated_content
                         logger.warning("Context length exceeded; truncating prompt and retrying once.")
                         continue
-                    if "model_not_found" in error_msg or "does not have access" in error_msg:
+                    if _is_model_unavailable_error(error_msg):
                         logger.warning(f"Model '{model_to_try}' not available, trying fallback models...")
                         break
+                    if _is_account_error(e):
+                        self._raise_api_error(e, models_to_try)
+                    # Model-specific 400s, and 5xx or connection errors that outlasted the retries
+                    logger.warning(f"Model '{model_to_try}' failed ({error_msg}); trying fallback models...")
                     break
 
+                if model_to_try != self.model:
+                    logger.info(f"Successfully used fallback model '{model_to_try}' instead of '{self.model}'")
+                parts = []
+                final_usage = None
+                try:
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        usage = None
+                        if chunk.usage:
+                            usage = final_usage = {
+                                'prompt_tokens': chunk.usage.prompt_tokens,
+                                'completion_tokens': chunk.usage.completion_tokens,
+                                'total_tokens': chunk.usage.total_tokens,
+                                'cached_tokens': _cached_prompt_tokens(chunk.usage),
+                                'model': model_to_try
+                            }
+                            if usage['cached_tokens']:
+                                logger.info(f"Prompt cache hit: {usage['cached_tokens']}/{usage['prompt_tokens']} prompt tokens cached")
+                        if delta and cache_key:
+                            parts.append(delta)
+                        if delta or usage:
+                            yield delta or "", usage
+                finally:
+                    # Closing early (consumer stopped iterating) drops the HTTP stream and its remaining tokens
+                    await stream.close()
+                if cache_key:
+                    await self.cache.set(cache_key, "".join(parts).strip(), final_usage or {})
+                return
+
+        self._raise_api_error(last_error, models_to_try)
+    
+    async def generate_batch(self, requests: List[Dict]) -> str:
+        """Submit chat completions to the Batch API and return the batch id.
+
+        Each request is a dict with custom_id, prompt, max_tokens, temperature and an optional seed.
+        """
+        lines = [
+            json.dumps({
+                "custom_id": req['custom_id'],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [SYSTEM_MESSAGE, {"role": "user", "content": req['prompt']}],
+                    **_completion_params(self.model, req['max_tokens'], req['temperature']),
+                    **({"seed": req['seed']} if req.get('seed') is not None else {})
+                }
+            })
+            for req in requests
+        ]
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        batch_file = await self.aclient.files.create(file=("batch.jsonl", payload), purpose="batch")
+        batch = await self.aclient.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+        logger.info(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+        return batch.id
+    
+    async def wait_for_batch(self, batch_id: str, poll_interval: float = 60.0,
+                             max_wait: float = BATCH_MAX_WAIT_SECONDS) -> Dict[str, Dict]:
+        """Poll a batch until it finishes and return its results keyed by custom_id.
+
+        Raises if the batch fails or is still unfinished after max_wait seconds.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            batch = await self.aclient.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise Exception(f"OpenAI API error: batch {batch_id} {batch.status}")
+            if time.monotonic() >= deadline:
+                raise Exception(f"OpenAI API error: batch {batch_id} still {batch.status} after {max_wait:.0f}s")
+            await asyncio.sleep(poll_interval)
+        
+        results = {}
+        if not batch.output_file_id:
+            return results
+        output = await self.aclient.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get('response') or {}
+            if response.get('status_code') != 200:
+                logger.warning(f"Batch request {item.get('custom_id')} failed: {item.get('error') or response}")
+                continue
+            body = response['body']
+            usage = body.get('usage') or {}
+            results[item['custom_id']] = {
+                'content': (body['choices'][0]['message']['content'] or "").strip(),
+                'prompt_tokens': usage.get('prompt_tokens', 0),
+                'completion_tokens': usage.get('completion_tokens', 0),
+                'total_tokens': usage.get('total_tokens', 0),
+                'model': body.get('model', self.model)
+            }
+        return results
+    
+    @retry(
+        retry=retry_if_exception(_is_transient_error),
+        wait=wait_random_exponential(min=1, max=30),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    async def _create_completion(self, model: str, user_content: str, max_tokens: int,
+                                 temperature: float, **kwargs):
+        """Issue one chat completion under the concurrency and rate limits; transient errors back off and retry"""
+        async with self._semaphore:
+            await self.rate_limiter.acquire(estimate_tokens(model, SYSTEM_PROMPT + user_content) + max_tokens)
+            return await self.aclient.chat.completions.create(
+                model=model,
+                messages=[SYSTEM_MESSAGE, {"role": "user", "content": user_content}],
+                **_completion_params(model, max_tokens, temperature),
+                **kwargs
+            )
+    
+    def _raise_api_error(self, last_error: Optional[Exception], models_to_try: List[str]):
+        """Log and raise the final error once retries and fallback models are exhausted"""
         error_msg = str(last_error) if last_error else "Unknown error"
         logger.error(f"Error generating text with OpenAI: {error_msg}", exc_info=True)
-        if "model_not_found" in error_msg or "does not have access" in error_msg:
+        if _is_model_unavailable_error(error_msg):
             raise Exception(f"OpenAI API error: None of the attempted models are available. Tried: {', '.join(models_to_try)}. Please set OPENAI_MODEL environment variable to a model your project has access to. Original error: {error_msg}")
         raise Exception(f"OpenAI API error: {error_msg}")
     
+    @staticmethod
+    def _cached_result(cached: Dict, model: str) -> Dict:
+        """Build a result for a cache hit; no tokens were spent on it"""
+        logger.info(f"Serving '{model}' completion from response cache")
+        return {
+            'content': cached['content'],
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'total_tokens': 0,
+            'cached_tokens': 0,
+            'model': model,
+            'cached': True
+        }
+    
     async def get_credit_info(self) -> Dict:
-        """Get OpenAI API credit/usage information"""
+        """Get OpenAI API credit/usage information, cached briefly so dashboard refreshes stay cheap"""
+        async with self._credit_info_lock:
+            now = time.monotonic()
+            if self._credit_info_cache and now - self._credit_info_cache[0] < CREDIT_INFO_TTL_SECONDS:
+                return self._credit_info_cache[1]
+            info = await self._fetch_credit_info()
+            self._credit_info_cache = (now, info)
+            return info
+    
+    async def _fetch_credit_info(self) -> Dict:
+        """Check the API key and build the credit/usage status"""
         try:
             # Check if API key is configured
             if not self.api_key or self.api_key == "your_api_key_here":
@@ -142,20 +423,12 @@ class OpenAIService:
                     'error': 'missing_api_key'
                 }
             
-            # Check API key validity by attempting a small API call
+            # Check API key validity with an auth-only request
             # Note: OpenAI doesn't provide a direct "credits" endpoint via API
             # We'll verify the key works and provide dashboard link for actual credits
             try:
-                # Make a minimal test call (1 token) to verify API key works
-                test_response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": "hi"}],
-                    max_tokens=1
-                )
-                
-                # Extract usage information
-                usage = test_response.usage
-                tokens_used = usage.total_tokens if usage else 0
+                # Listing models is a cheap GET that spends no tokens
+                await self.aclient.models.list(timeout=5)
                 
                 # API key is valid and working
                 return {
@@ -163,7 +436,6 @@ class OpenAIService:
                     'message': 'API Active - Check Dashboard for Credits',
                     'status': 'operational',
                     'model': self.model,
-                    'test_tokens_used': tokens_used,
                     'note': 'OpenAI API is active. Check dashboard for remaining credits/balance.',
                     'dashboard_url': 'https://platform.openai.com/usage',
                     'balance_url': 'https://platform.openai.com/account/billing',
@@ -0,0 +1,67 @@
+import time
+import asyncio
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a ~4 chars/token estimate
+    tiktoken = None
+
+
+@lru_cache(maxsize=16)
+def get_encoding(model: str):
+    """tiktoken encoding for a model, or None when tiktoken is not installed"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(model: str, text: str) -> int:
+    """Estimate prompt tokens for a model"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+class TokenBucket:
+    """Async RPM/TPM bucket that delays requests which would exceed the rate limits"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.available_request_capacity = float(rpm)
+        self.available_token_capacity = float(tpm)
+        self.last_update_time = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_update_time
+        self.available_request_capacity = min(self.rpm, self.available_request_capacity + elapsed * self.rpm / 60)
+        self.available_token_capacity = min(self.tpm, self.available_token_capacity + elapsed * self.tpm / 60)
+        self.last_update_time = now
+
+    async def acquire(self, tokens: int):
+        """Wait until one request and the given number of tokens fit in the budget, then consume them"""
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available_request_capacity >= 1 and self.available_token_capacity >= tokens:
+                    self.available_request_capacity -= 1
+                    self.available_token_capacity -= tokens
+                    return
+                wait = max(
+                    (1 - self.available_request_capacity) * 60 / self.rpm,
+                    (tokens - self.available_token_capacity) * 60 / self.tpm,
+                    0.05
+                )
+                logger.debug(f"Rate limiter delaying request {wait:.2f}s")
+                await asyncio.sleep(wait)
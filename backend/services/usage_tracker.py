@@ -1,12 +1,59 @@
 import os
 import json
+import time
+import queue
+import shutil
+import atexit
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
 from pathlib import Path
+from utils.file_io import advise_sequential
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; without it a legacy usage.json is parsed whole
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+# Background flusher batches entries until either limit is reached
+FLUSH_MAX_ENTRIES = 100
+FLUSH_INTERVAL_SECONDS = 5.0
+# Large enough that a flushed batch or aggregates.json goes out in a single write()
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Usage files are machine-read only, so skip indentation and padding
+COMPACT_SEPARATORS = (',', ':')
+
+try:
+    import orjson
+    _loads = orjson.loads
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # orjson is optional; stdlib json writes the same compact output, just slower
+    _loads = json.loads
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, separators=COMPACT_SEPARATORS)
+
+# Per-month quantity tracked alongside cost for each provider
+MONTH_METRICS = {"openai": "tokens", "assemblyai": "minutes"}
+
+
+def _iter_legacy_entries(legacy_file: Path, provider: str) -> Iterator[Dict]:
+    """Stream one provider's entries out of a legacy usage.json without loading the whole list"""
+    with open(legacy_file, 'rb') as f:
+        advise_sequential(f)
+        if ijson is None:
+            yield from _loads(f.read()).get(provider, [])
+            return
+        yield from ijson.items(f, f"{provider}.item", use_float=True)
+
+
 class UsageTracker:
     """Track API usage for OpenAI and AssemblyAI"""
     
@@ -19,11 +66,19 @@ class UsageTracker:
         "gpt-4": {"input": 30.00, "output": 60.00},
         "default": {"input": 0.15, "output": 0.60}  # Default to gpt-4o-mini pricing
     }
+    # Same prices per single token, so cost is a plain multiply-add
+    _OPENAI_PER_TOKEN = {
+        model: {"input": p["input"] / 1_000_000, "output": p["output"] / 1_000_000}
+        for model, p in OPENAI_PRICING.items()
+    }
     
     # AssemblyAI pricing: $0.00025 per second = $0.015 per minute
     ASSEMBLYAI_PRICE_PER_SECOND = 0.00025
     ASSEMBLYAI_PRICE_PER_MINUTE = 0.015
     
+    # (date string, time.time() of the next local midnight, when it stops being valid)
+    _cached_date = (None, 0.0)
+    
     def __init__(self, data_dir: Optional[str] = None):
         """Initialize usage tracker with data directory"""
         if data_dir is None:
@@ -35,58 +90,186 @@ class UsageTracker:
         
         self.data_dir = data_dir
         self.data_dir.mkdir(exist_ok=True)
-        self.usage_file = self.data_dir / "usage.json"
-        
-        # Initialize usage file if it doesn't exist
-        if not self.usage_file.exists():
-            self._initialize_usage_file()
-    
-    def _initialize_usage_file(self):
-        """Initialize empty usage file"""
-        initial_data = {
-            "openai": [],
-            "assemblyai": []
+        # Append-only JSON Lines, one file per provider
+        self.usage_files = {
+            "openai": self.data_dir / "usage_openai.jsonl",
+            "assemblyai": self.data_dir / "usage_assemblyai.jsonl"
         }
-        with open(self.usage_file, 'w') as f:
-            json.dump(initial_data, f, indent=2)
-        logger.info(f"Initialized usage file at {self.usage_file}")
+        self._migrate_legacy_usage_file(self.data_dir / "usage.json")
+        
+        # Running per-month totals, so get_usage_stats does not rescan history
+        self.aggregates_file = self.data_dir / "aggregates.json"
+        self._aggregates = self._load_aggregates()
+        
+        # track_* calls only enqueue; a daemon thread batches the disk writes
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="usage-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self._flush_now)
     
-    def _load_usage_data(self) -> Dict:
-        """Load usage data from JSON file"""
+    def _migrate_legacy_usage_file(self, legacy_file: Path):
+        """Move entries from the old single usage.json into the JSONL files, once.
+        
+        Entries are streamed into temporary files first, so a file that fails to parse
+        halfway leaves the JSONL history untouched.
+        """
+        if not legacy_file.exists():
+            return
+        
+        staged = {}
         try:
-            if not self.usage_file.exists():
-                self._initialize_usage_file()
+            for provider, path in self.usage_files.items():
+                staged[provider] = path.with_suffix(".jsonl.migrating")
+                with open(staged[provider], 'w', buffering=WRITE_BUFFER_SIZE) as out:
+                    out.writelines(_dumps(entry) + '\n' for entry in _iter_legacy_entries(legacy_file, provider))
             
-            with open(self.usage_file, 'r') as f:
-                return json.load(f)
+            for provider, path in self.usage_files.items():
+                with open(staged[provider], 'r') as src, open(path, 'a', buffering=WRITE_BUFFER_SIZE) as dst:
+                    shutil.copyfileobj(src, dst)
         except Exception as e:
-            logger.error(f"Error loading usage data: {e}", exc_info=True)
-            return {"openai": [], "assemblyai": []}
+            logger.error(f"Error migrating legacy usage file: {e}", exc_info=True)
+            return
+        finally:
+            for staged_file in staged.values():
+                staged_file.unlink(missing_ok=True)
+        
+        legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+        logger.info(f"Migrated {legacy_file} to JSONL usage files")
+    
+    def _enqueue(self, provider: str, entry: Dict):
+        """Queue an entry for the flusher; wakes it early once a full batch is waiting"""
+        self._queue.put((provider, entry))
+        if self._queue.qsize() >= FLUSH_MAX_ENTRIES:
+            self._flush_event.set()
+    
+    def _flush_loop(self):
+        """Flush queued entries every FLUSH_INTERVAL_SECONDS or sooner when a batch fills up"""
+        while True:
+            self._flush_event.wait(FLUSH_INTERVAL_SECONDS)
+            self._flush_event.clear()
+            self._flush_now()
     
-    def _save_usage_data(self, data: Dict):
-        """Save usage data to JSON file"""
+    def _flush_now(self):
+        """Write everything still queued, opening each file once; used at exit and before reading stats"""
+        with self._write_lock:
+            lines_by_provider: Dict[str, List[str]] = {}
+            while True:
+                try:
+                    provider, entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                lines_by_provider.setdefault(provider, []).append(_dumps(entry) + '\n')
+                self._apply_to_aggregates(self._aggregates, provider, entry)
+            
+            for provider, lines in lines_by_provider.items():
+                try:
+                    with open(self.usage_files[provider], 'a', buffering=WRITE_BUFFER_SIZE) as f:
+                        f.writelines(lines)
+                        f.flush()
+                except Exception as e:
+                    logger.error(f"Error writing {provider} usage entries: {e}", exc_info=True)
+            
+            if lines_by_provider:
+                self._save_aggregates(self._aggregates)
+    
+    def _iter_usage_entries(self, provider: str) -> Iterator[Dict]:
+        """Stream a provider's entries line by line"""
+        try:
+            with open(self.usage_files[provider], 'r') as f:
+                advise_sequential(f)
+                for line in f:
+                    if line.strip():
+                        yield _loads(line)
+        except FileNotFoundError:
+            return
+    
+    @classmethod
+    def _empty_aggregates(cls) -> Dict:
+        return cls._with_month_defaults({
+            "openai_by_month": {},
+            "assemblyai_by_month": {},
+            "total_openai_cost": 0.0,
+            "total_assemblyai_cost": 0.0
+        })
+    
+    @staticmethod
+    def _with_month_defaults(aggregates: Dict) -> Dict:
+        """Wrap the per-month dicts in defaultdicts so a new month needs no membership check"""
+        for provider, metric in MONTH_METRICS.items():
+            default = 0 if metric == "tokens" else 0.0
+            aggregates[f"{provider}_by_month"] = defaultdict(
+                lambda default=default, metric=metric: {"cost": 0.0, metric: default},
+                aggregates.get(f"{provider}_by_month", {})
+            )
+        return aggregates
+    
+    @staticmethod
+    def _apply_to_aggregates(aggregates: Dict, provider: str, entry: Dict):
+        """Add one usage entry to the running totals"""
+        cost = entry.get("cost", 0.0)
+        aggregates[f"total_{provider}_cost"] += cost
+        
+        # Dates are written by this module as YYYY-MM-DD, so the month is the first 7 chars
+        date_str = entry.get("date", "")
+        if len(date_str) < 7 or date_str[4] != '-':
+            return
+        
+        month = aggregates[f"{provider}_by_month"][date_str[:7]]
+        metric = MONTH_METRICS[provider]
+        month["cost"] += cost
+        month[metric] += entry.get(metric, 0)
+    
+    def _load_aggregates(self) -> Dict:
+        """Load aggregates.json, rebuilding it from the JSONL history when missing or unreadable"""
         try:
-            with open(self.usage_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(self.aggregates_file, 'r') as f:
+                return self._with_month_defaults(_loads(f.read()))
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            logger.error(f"Error saving usage data: {e}", exc_info=True)
+            logger.error(f"Error loading usage aggregates, rebuilding: {e}", exc_info=True)
+        
+        aggregates = self._empty_aggregates()
+        for provider in self.usage_files:
+            for entry in self._iter_usage_entries(provider):
+                self._apply_to_aggregates(aggregates, provider, entry)
+        self._save_aggregates(aggregates)
+        return aggregates
+    
+    def _save_aggregates(self, aggregates: Dict):
+        """Persist the running totals atomically, so a concurrent read never sees a partial file"""
+        try:
+            tmp_file = self.aggregates_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(_dumps(aggregates))
+            os.replace(tmp_file, self.aggregates_file)
+        except Exception as e:
+            logger.error(f"Error saving usage aggregates: {e}", exc_info=True)
+    
+    def _today(self) -> str:
+        """Today's date as YYYY-MM-DD, cached until the next local midnight"""
+        date_str, expires_at = self._cached_date
+        if date_str is not None and time.time() < expires_at:
+            return date_str
+        now = datetime.now()
+        date_str = now.strftime("%Y-%m-%d")
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self._cached_date = (date_str, next_midnight.timestamp())
+        return date_str
     
     def _calculate_openai_cost(self, prompt_tokens: int, completion_tokens: int, model: str) -> float:
         """Calculate OpenAI cost based on token usage and model"""
-        pricing = self.OPENAI_PRICING.get(model, self.OPENAI_PRICING["default"])
-        
-        # Convert to cost per 1M tokens
-        input_cost = (prompt_tokens / 1_000_000) * pricing["input"]
-        output_cost = (completion_tokens / 1_000_000) * pricing["output"]
-        
-        return input_cost + output_cost
+        pricing = self._OPENAI_PER_TOKEN.get(model, self._OPENAI_PER_TOKEN["default"])
+        return prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]
     
     def track_openai_usage(self, prompt_tokens: int, completion_tokens: int, 
                           total_tokens: int, model: str = "gpt-4o-mini"):
         """Track OpenAI API usage"""
         try:
             cost = self._calculate_openai_cost(prompt_tokens, completion_tokens, model)
-            date = datetime.now().strftime("%Y-%m-%d")
+            date = self._today()
             
             usage_entry = {
                 "date": date,
@@ -97,9 +280,7 @@ class UsageTracker:
                 "model": model
             }
             
-            data = self._load_usage_data()
-            data["openai"].append(usage_entry)
-            self._save_usage_data(data)
+            self._enqueue("openai", usage_entry)
             
             logger.info(f"Tracked OpenAI usage: {total_tokens} tokens, ${cost:.6f}, model: {model}")
         except Exception as e:
@@ -110,7 +291,7 @@ class UsageTracker:
         try:
             duration_minutes = duration_seconds / 60.0
             cost = duration_seconds * self.ASSEMBLYAI_PRICE_PER_SECOND
-            date = datetime.now().strftime("%Y-%m-%d")
+            date = self._today()
             
             usage_entry = {
                 "date": date,
@@ -119,9 +300,7 @@ class UsageTracker:
                 "cost": round(cost, 6)
             }
             
-            data = self._load_usage_data()
-            data["assemblyai"].append(usage_entry)
-            self._save_usage_data(data)
+            self._enqueue("assemblyai", usage_entry)
             
             logger.info(f"Tracked AssemblyAI usage: {duration_seconds:.2f}s ({duration_minutes:.2f}min), ${cost:.6f}")
         except Exception as e:
@@ -130,41 +309,13 @@ class UsageTracker:
     def get_usage_stats(self) -> Dict:
         """Get usage statistics grouped by month"""
         try:
-            data = self._load_usage_data()
-            
-            # Group OpenAI usage by month
-            openai_by_month = {}
-            for entry in data.get("openai", []):
-                date_str = entry.get("date", "")
-                if date_str:
-                    try:
-                        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                        month_key = date_obj.strftime("%Y-%m")
-                        if month_key not in openai_by_month:
-                            openai_by_month[month_key] = {"cost": 0.0, "tokens": 0}
-                        openai_by_month[month_key]["cost"] += entry.get("cost", 0.0)
-                        openai_by_month[month_key]["tokens"] += entry.get("tokens", 0)
-                    except ValueError:
-                        continue
-            
-            # Group AssemblyAI usage by month
-            assemblyai_by_month = {}
-            for entry in data.get("assemblyai", []):
-                date_str = entry.get("date", "")
-                if date_str:
-                    try:
-                        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                        month_key = date_obj.strftime("%Y-%m")
-                        if month_key not in assemblyai_by_month:
-                            assemblyai_by_month[month_key] = {"cost": 0.0, "minutes": 0.0}
-                        assemblyai_by_month[month_key]["cost"] += entry.get("cost", 0.0)
-                        assemblyai_by_month[month_key]["minutes"] += entry.get("minutes", 0.0)
-                    except ValueError:
-                        continue
+            self._flush_now()
             
-            # Calculate totals
-            total_openai_cost = sum(entry.get("cost", 0.0) for entry in data.get("openai", []))
-            total_assemblyai_cost = sum(entry.get("cost", 0.0) for entry in data.get("assemblyai", []))
+            with self._write_lock:
+                openai_by_month = {k: dict(v) for k, v in self._aggregates["openai_by_month"].items()}
+                assemblyai_by_month = {k: dict(v) for k, v in self._aggregates["assemblyai_by_month"].items()}
+                total_openai_cost = self._aggregates["total_openai_cost"]
+                total_assemblyai_cost = self._aggregates["total_assemblyai_cost"]
             
             return {
                 "openai_by_month": openai_by_month,
@@ -1,15 +1,93 @@
 import yt_dlp
 # from pytube import YouTube  # Commented out - replaced with yt-dlp due to HTTP 400 errors
 import os
+import time
+import random
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from youtube_transcript_api import YouTubeTranscriptApi
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from youtube_transcript_api import YouTubeRequestFailed
+# Private in youtube-transcript-api; it is the only way to fetch over our pooled session, since
+# the public YouTubeTranscriptApi.list_transcripts opens a new requests.Session per call. The
+# package is pinned to an exact version in requirements.txt for this reason.
+from youtube_transcript_api._transcripts import TranscriptListFetcher
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from youtube_transcript_api.formatters import TextFormatter
 import re
 import subprocess
 
 logger = logging.getLogger(__name__)
 
+# Matches ?v=ID, /ID, /embed/ID and watch?v=ID; "embed/" and "watch?v=" are covered by "/" and "v="
+_VIDEO_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11})')
+
+# How long fetched metadata and transcripts are reused for the same video
+VIDEO_INFO_TTL_SECONDS = 3600
+TRANSCRIPT_TTL_SECONDS = 300
+# Random delay before live YouTube calls (seconds); spreading requests out avoids bot-detection walls
+TRANSCRIPT_JITTER_MAX = float(os.getenv("YOUTUBE_TRANSCRIPT_JITTER_MAX", "2"))
+VIDEO_INFO_JITTER_MAX = float(os.getenv("YOUTUBE_INFO_JITTER_MAX", "5"))
+# Expired entries are swept once a TTL cache grows past this many videos
+TTL_CACHE_SWEEP_SIZE = 256
+
+
+@lru_cache(maxsize=1024)
+def _extract_video_id_cached(url: str) -> Optional[str]:
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+
+def _ttl_get(cache: Dict[str, Tuple[Any, float]], key: str) -> Optional[Any]:
+    """Value for key if present and not expired, else None"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if time.monotonic() >= expires_at:
+        del cache[key]
+        return None
+    return value
+
+
+def _ttl_set(cache: Dict[str, Tuple[Any, float]], key: str, value: Any, ttl: float):
+    now = time.monotonic()
+    if len(cache) >= TTL_CACHE_SWEEP_SIZE:
+        for stale_key in [k for k, (_, expires_at) in cache.items() if now >= expires_at]:
+            del cache[stale_key]
+    cache[key] = (value, now + ttl)
+
+
+def _timecode_entry(text: str, start: float, duration: float) -> Dict:
+    return {'text': text, 'start': start, 'duration': duration, 'end': start + duration}
+
+
+# Throttling and server errors as worded by yt-dlp ("HTTP Error 429: ...") and requests ("503 Server Error: ...")
+_RETRYABLE_HTTP_RE = re.compile(r'HTTP Error (?:429|5\d\d)\b|\b(?:429 Client|5\d\d Server) Error')
+
+
+def _is_retryable_youtube_error(error: BaseException) -> bool:
+    """429s, 5xx and dropped connections are worth a backed-off retry; bot checks and 403s are not"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    message = str(error)
+    if 'Sign in to confirm' in message or 'HTTP Error 403' in message:
+        return False
+    if isinstance(error, (yt_dlp.utils.DownloadError, YouTubeRequestFailed)):
+        return bool(_RETRYABLE_HTTP_RE.search(message))
+    return False
+
+
+# Exponential backoff with full jitter; replaces yt-dlp's own near-constant retries
+_youtube_retry = retry(
+    retry=retry_if_exception(_is_retryable_youtube_error),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(4),
+    reraise=True
+)
+
 class YouTubeService:
     def __init__(self, upload_dir: str = "./uploads"):
         self.upload_dir = upload_dir
@@ -21,47 +99,96 @@ class YouTubeService:
         # Ensure cookies directory exists
         os.makedirs(self.cookies_dir, exist_ok=True)
         self.uploaded_cookies_path = os.path.join(self.cookies_dir, "cookies.txt")
+        # Cookie validation results and the selected cookie path, keyed by file stat
+        self._cookie_cache: Dict[tuple, object] = {}
+        # Keep-alive session for transcript requests, so repeat fetches skip the TCP/TLS handshake
+        self._http_session = requests.Session()
+        self._http_session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+        # video_id -> (result, expires_at); regenerate/retry requests skip the YouTube round trips
+        self._video_info_cache: Dict[str, Tuple[Dict, float]] = {}
+        self._transcript_cache: Dict[str, Tuple[Dict, float]] = {}
+        # Shared metadata extractor, see _get_info_ydl
+        self._info_ydl: Optional["yt_dlp.YoutubeDL"] = None
+        self._info_ydl_cookie_key: Optional[tuple] = None
+        self._info_ydl_lock = asyncio.Lock()
+        # Static yt-dlp options, built once; _build_ydl_opts adds outtmpl and cookies
+        self._base_ydl_opts = {
+            'format': 'bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+            'quiet': False,
+            'no_warnings': False,
+            # Enhanced bot detection bypass
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'referer': 'https://www.youtube.com/',
+            'extractor_args': {
+                'youtube': {
+                    'skip': ['dash', 'hls'],
+                    'player_client': ['android', 'ios', 'web'],  # Try multiple clients as fallback
+                }
+            },
+            'retries': 10,
+            'fragment_retries': 10,
+            'ignoreerrors': False,
+            # Additional bot detection bypass strategies
+            'no_check_certificate': False,  # Ensure SSL verification is on
+            'prefer_insecure': False,
+            'socket_timeout': 30,
+        }
         
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-            r'(?:embed\/)([0-9A-Za-z_-]{11})',
-            r'(?:watch\?v=)([0-9A-Za-z_-]{11})',
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        video_id = _extract_video_id_cached(url)
+        if video_id:
+            return video_id
         raise ValueError(f"Could not extract video ID from URL: {url}")
     
+    @staticmethod
+    def _stat_key(path: str) -> Optional[tuple]:
+        """(path, mtime_ns, size) for an existing file, or None; changes whenever the file does"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (path, st.st_mtime_ns, st.st_size)
+    
     def _validate_cookie_file(self, cookie_path: str) -> bool:
-        """Validate that the cookie file exists and has valid content"""
+        """Validate that the cookie file exists and has valid content; cached per (path, mtime, size)"""
+        key = self._stat_key(cookie_path)
+        if key is None:
+            logger.error(f"Cookie file does not exist: {cookie_path}")
+            return False
+        if key in self._cookie_cache:
+            return self._cookie_cache[key]
+        
+        valid = self._check_cookie_file(cookie_path, file_size=key[2])
+        self._cookie_cache[key] = valid
+        return valid
+    
+    def _check_cookie_file(self, cookie_path: str, file_size: int) -> bool:
+        """Inspect the cookie file's first lines for a Netscape-style format"""
         try:
-            if not os.path.exists(cookie_path):
-                logger.error(f"Cookie file does not exist: {cookie_path}")
-                return False
-                
-            file_size = os.path.getsize(cookie_path)
             if file_size == 0:
                 logger.error(f"Cookie file is empty: {cookie_path}")
                 return False
                 
-            # Read first few lines to check format
-            with open(cookie_path, 'r', encoding='utf-8', errors='ignore') as f:
-                first_lines = [f.readline().strip() for _ in range(5)]
-                content = '\n'.join(first_lines)
-                
-                # Check for Netscape cookie format indicators
-                # Valid formats: starts with # Netscape HTTP Cookie File, or has tab-separated cookie entries
-                if '# Netscape HTTP Cookie File' in content:
-                    logger.debug(f"Cookie file appears to be in Netscape format: {cookie_path}")
-                elif '\t' in content:
-                    # Tab-separated format (Netscape format without header)
-                    logger.debug(f"Cookie file appears to be in tab-separated format: {cookie_path}")
-                else:
-                    logger.warning(f"Cookie file format may be invalid (no Netscape header or tabs): {cookie_path}")
-                    # Still allow it, as yt-dlp might handle it
+            # The first 512 bytes are enough to sniff the format; no decoding needed
+            with open(cookie_path, 'rb') as f:
+                head = f.read(512)
+            
+            # Check for Netscape cookie format indicators
+            # Valid formats: starts with # Netscape HTTP Cookie File, or has tab-separated cookie entries
+            if b'# Netscape HTTP Cookie File' in head:
+                logger.debug(f"Cookie file appears to be in Netscape format: {cookie_path}")
+            elif b'\t' in head:
+                # Tab-separated format (Netscape format without header)
+                logger.debug(f"Cookie file appears to be in tab-separated format: {cookie_path}")
+            else:
+                logger.warning(f"Cookie file format may be invalid (no Netscape header or tabs): {cookie_path}")
+                # Still allow it, as yt-dlp might handle it
             
             logger.info(f"Cookie file validated: {cookie_path} (size: {file_size} bytes)")
             return True
@@ -70,9 +197,30 @@ class YouTubeService:
             return False
     
     def _get_cookies_file_path(self) -> Optional[str]:
-        """Get cookie file path, checking multiple locations in priority order"""
-        # 1. Check uploaded cookies file first
+        """Get cookie file path, checking multiple locations in priority order.
+        
+        The choice is cached under the stat keys of both candidates, so it is only
+        re-resolved when a cookie file or YOUTUBE_COOKIES_FILE changes.
+        """
         abs_path = os.path.abspath(self.uploaded_cookies_path)
+        env_cookies_file = os.getenv('YOUTUBE_COOKIES_FILE', None)
+        abs_env_path = os.path.abspath(env_cookies_file) if env_cookies_file else None
+        cache_key = (
+            'selected',
+            self._stat_key(abs_path),
+            self._stat_key(abs_env_path) if abs_env_path else None,
+            abs_env_path
+        )
+        if cache_key in self._cookie_cache:
+            return self._cookie_cache[cache_key]
+        
+        selected = self._resolve_cookies_file_path(abs_path, abs_env_path)
+        self._cookie_cache[cache_key] = selected
+        return selected
+    
+    def _resolve_cookies_file_path(self, abs_path: str, abs_env_path: Optional[str]) -> Optional[str]:
+        """Pick the first valid cookie file: uploaded file, then YOUTUBE_COOKIES_FILE"""
+        # 1. Check uploaded cookies file first
         if os.path.exists(abs_path):
             if self._validate_cookie_file(abs_path):
                 file_size = os.path.getsize(abs_path)
@@ -84,9 +232,7 @@ class YouTubeService:
             logger.debug(f"Uploaded cookies file not found at: {abs_path}")
         
         # 2. Check environment variable (backward compatibility)
-        env_cookies_file = os.getenv('YOUTUBE_COOKIES_FILE', None)
-        if env_cookies_file:
-            abs_env_path = os.path.abspath(env_cookies_file)
+        if abs_env_path:
             if os.path.exists(abs_env_path):
                 if self._validate_cookie_file(abs_env_path):
                     logger.info(f"✓ Using cookies file from env var: {abs_env_path}")
@@ -101,34 +247,8 @@ class YouTubeService:
     
     def _build_ydl_opts(self, output_path: str, use_cookies: bool = True) -> dict:
         """Build yt-dlp options with enhanced bot detection bypass and optional cookie support"""
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': output_path,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'quiet': False,
-            'no_warnings': False,
-            # Enhanced bot detection bypass
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'referer': 'https://www.youtube.com/',
-            'extractor_args': {
-                'youtube': {
-                    'skip': ['dash', 'hls'],
-                    'player_client': ['android', 'ios', 'web'],  # Try multiple clients as fallback
-                }
-            },
-            # Retry options for network issues
-            'retries': 10,
-            'fragment_retries': 10,
-            'ignoreerrors': False,
-            # Additional bot detection bypass strategies
-            'no_check_certificate': False,  # Ensure SSL verification is on
-            'prefer_insecure': False,
-            'socket_timeout': 30,
-        }
+        # Only outtmpl and cookie keys vary per call
+        ydl_opts = {**self._base_ydl_opts, 'outtmpl': output_path}
         
         if use_cookies:
             # Hybrid cookie strategy (in priority order):
@@ -216,75 +336,123 @@ class YouTubeService:
     #         logger.error(f"Error downloading audio with yt-dlp: {str(e)}", exc_info=True)
     #         raise Exception(f"Failed to download audio: {str(e)}")
     
+    @_youtube_retry
+    def _fetch_transcript(self, video_id: str) -> List[Dict]:
+        """YouTubeTranscriptApi.get_transcript(video_id), but over the pooled session.
+        
+        get_transcript opens a new requests.Session per call; this mirrors its defaults
+        (English transcript, formatting stripped).
+        """
+        transcript_list = TranscriptListFetcher(self._http_session).fetch(video_id)
+        return transcript_list.find_transcript(('en',)).fetch()
+    
+    async def _fetch_transcript_async(self, video_id: str) -> List[Dict]:
+        """Jittered _fetch_transcript, run off the event loop"""
+        await asyncio.sleep(random.uniform(0, TRANSCRIPT_JITTER_MAX))
+        return await asyncio.to_thread(self._fetch_transcript, video_id)
+    
     async def get_transcript(self, youtube_url: str) -> Dict:
         """Get transcript with timecodes from YouTube"""
         try:
             video_id = self._extract_video_id(youtube_url)
+            cached = _ttl_get(self._transcript_cache, video_id)
+            if cached is not None:
+                logger.debug(f"Transcript cache hit for {video_id}")
+                return dict(cached)
             
-            # Try to get transcript
-            try:
-                transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            except Exception as e:
-                logger.error(f"Error getting transcript: {str(e)}")
-                raise Exception(f"Transcript not available for this video: {str(e)}")
-            
-            # Format transcript with timecodes
-            transcript_with_timecodes = []
-            full_transcript_text = ""
+            # Transcript and video info are independent round trips to YouTube, so fetch them together
+            # (each after its own jitter); _get_video_info never raises.
+            transcript_list, video_info = await asyncio.gather(
+                self._fetch_transcript_async(video_id),
+                self._get_video_info(youtube_url),
+                return_exceptions=True
+            )
+            if isinstance(transcript_list, Exception):
+                logger.error(f"Error getting transcript: {str(transcript_list)}")
+                raise Exception(f"Transcript not available for this video: {str(transcript_list)}")
             
-            for entry in transcript_list:
-                text = entry['text'].strip()
-                start = entry['start']
-                duration = entry.get('duration', 0)
-                
-                transcript_with_timecodes.append({
-                    'text': text,
-                    'start': start,
-                    'duration': duration,
-                    'end': start + duration
-                })
-                full_transcript_text += text + " "
+            # Format transcript with timecodes; one comprehension sizes the list up front
+            transcript_with_timecodes = [
+                _timecode_entry(entry['text'].strip(), entry['start'], entry.get('duration') or 0)
+                for entry in transcript_list
+            ]
             
-            # Get video info using yt-dlp
-            video_info = await self._get_video_info(youtube_url)
+            full_transcript_text = " ".join(tc['text'] for tc in transcript_with_timecodes)
             
-            return {
+            result = {
                 'transcript': full_transcript_text.strip(),
                 'transcript_with_timecodes': transcript_with_timecodes,
                 'title': video_info.get('title', ''),
                 'duration': video_info.get('duration', 0)
             }
+            _ttl_set(self._transcript_cache, video_id, result, TRANSCRIPT_TTL_SECONDS)
+            return dict(result)
             
         except Exception as e:
             logger.error(f"Error getting transcript: {str(e)}", exc_info=True)
             raise
     
+    def _get_info_ydl(self) -> "yt_dlp.YoutubeDL":
+        """Long-lived YoutubeDL for metadata, rebuilt only when the cookie setup changes"""
+        # Build options with cookie support for video info extraction
+        base_output_path = os.path.join(self.upload_dir, "temp_info")
+        ydl_opts = self._build_ydl_opts(
+            output_path=base_output_path + '.%(ext)s',
+            use_cookies=True
+        )
+        # Override for info extraction only
+        ydl_opts.update({
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            # Retries are handled by _youtube_retry around _extract_info (backoff + jitter)
+            # rather than yt-dlp's fixed loop; downloads keep yt-dlp's own retries
+            'retries': 0,
+            'fragment_retries': 0,
+        })
+        
+        cookie_file = ydl_opts.get('cookiefile')
+        cookie_key = (
+            self._stat_key(cookie_file) if cookie_file else None,
+            tuple(ydl_opts.get('cookiesfrombrowser') or ())
+        )
+        if self._info_ydl is None or cookie_key != self._info_ydl_cookie_key:
+            if self._info_ydl is not None:
+                self._info_ydl.close()
+            self._info_ydl = yt_dlp.YoutubeDL(ydl_opts)
+            self._info_ydl_cookie_key = cookie_key
+        return self._info_ydl
+    
+    @_youtube_retry
+    def _extract_info(self, ydl: "yt_dlp.YoutubeDL", youtube_url: str) -> Optional[Dict]:
+        """Metadata-only extract_info, retried on throttling"""
+        return ydl.extract_info(youtube_url, download=False)
+    
     async def _get_video_info(self, youtube_url: str) -> Dict:
         """Get video metadata using yt-dlp"""
         try:
-            # Build options with cookie support for video info extraction
-            base_output_path = os.path.join(self.upload_dir, "temp_info")
-            ydl_opts = self._build_ydl_opts(
-                output_path=base_output_path + '.%(ext)s',
-                use_cookies=True
-            )
-            # Override for info extraction only
-            ydl_opts.update({
-                'quiet': True,
-                'no_warnings': True,
-                'skip_download': True,
-            })
+            video_id = self._extract_video_id(youtube_url)
+            cached = _ttl_get(self._video_info_cache, video_id)
+            if cached is not None:
+                return dict(cached)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=False)
-                title = info.get('title', '') if info else ''
-                duration = info.get('duration', 0) if info else 0  # Duration is in seconds
-                
-                logger.debug(f"Got video info - Title: {title}, Duration: {duration}s")
-                return {
-                    'title': title,
-                    'duration': duration
-                }
+            await asyncio.sleep(random.uniform(0, VIDEO_INFO_JITTER_MAX))
+            # One YoutubeDL is shared (extractors and HTTP session stay warm); it is not
+            # thread-safe, so extractions on it are serialized
+            async with self._info_ydl_lock:
+                ydl = self._get_info_ydl()
+                info = await asyncio.to_thread(self._extract_info, ydl, youtube_url)
+            title = info.get('title', '') if info else ''
+            duration = info.get('duration', 0) if info else 0  # Duration is in seconds
+            
+            logger.debug(f"Got video info - Title: {title}, Duration: {duration}s")
+            video_info = {
+                'title': title,
+                'duration': duration
+            }
+            # Failures fall through to the except below and are not cached
+            _ttl_set(self._video_info_cache, video_id, video_info, VIDEO_INFO_TTL_SECONDS)
+            return dict(video_info)
         except Exception as e:
             logger.warning(f"Could not get video info with yt-dlp: {str(e)}")
             return {'title': '', 'duration': 0}
@@ -35,6 +35,12 @@ PRICING = {
 # Default model
 DEFAULT_MODEL = "gpt-4o-mini"
 
+# (prompt, completion) cost per single token, derived from PRICING once
+_PER_TOKEN: Dict[str, Tuple[float, float]] = {
+    model: (pricing["prompt"] / 1000.0, pricing["completion"] / 1000.0)
+    for model, pricing in PRICING.items()
+}
+
 
 def get_model_pricing(model: str) -> Dict[str, float]:
     """
@@ -65,15 +71,13 @@ def calculate_token_cost(prompt_tokens: int, completion_tokens: int, model: str)
     Returns:
         Cost in USD (rounded to 6 decimal places)
     """
-    pricing = get_model_pricing(model)
-    
-    # Calculate costs per 1K tokens
-    prompt_cost = (prompt_tokens / 1000) * pricing["prompt"]
-    completion_cost = (completion_tokens / 1000) * pricing["completion"]
-    
-    total_cost = prompt_cost + completion_cost
+    rates = _PER_TOKEN.get(model)
+    if rates is None:
+        logger.warning(f"Model {model} not in pricing table, using default {DEFAULT_MODEL}")
+        rates = _PER_TOKEN[DEFAULT_MODEL]
     
-    return round(total_cost, 6)
+    prompt_rate, completion_rate = rates
+    return round(prompt_tokens * prompt_rate + completion_tokens * completion_rate, 6)
 
 
 def calculate_total_cost(total_tokens: int, model: str, prompt_completion_ratio: float = 0.7) -> float:
@@ -99,11 +103,16 @@ def get_all_models() -> list:
     return list(PRICING.keys())
 
 
+# Bound format methods, so the formatters skip the attribute lookup on each call
+_COST_FMT = "${:.4f}".format
+_TOKEN_FMT = "{:,}".format
+
+
 def format_cost(cost: float) -> str:
     """Format cost as USD string"""
-    return f"${cost:.4f}"
+    return _COST_FMT(cost)
 
 
 def format_token_count(tokens: int) -> str:
     """Format token count with thousands separator"""
-    return f"{tokens:,}"
+    return _TOKEN_FMT(tokens)
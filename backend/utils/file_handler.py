@@ -1,43 +1,59 @@
 import os
+import time
+import heapq
+import asyncio
 import logging
 import shutil
-from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Full directory sweeps run at most this often; in between, cleanup only checks files due to expire
+RECONCILE_INTERVAL_SECONDS = 24 * 3600
+
 class FileHandler:
     def __init__(self, upload_dir: str = "./uploads", max_age_hours: int = 336):  # Default: 2 weeks (336 hours)
         self.upload_dir = upload_dir
         self.max_age_hours = max_age_hours
         os.makedirs(upload_dir, exist_ok=True)
+        # Held open so unlinks resolve bare names against it instead of re-walking the full path
+        self._dirfd = (
+            os.open(upload_dir, os.O_RDONLY | os.O_DIRECTORY) if os.unlink in os.supports_dir_fd else None
+        )
+        # (expiry time, file name) for every file seen by the last sweep that was still fresh
+        self._expiry: List[Tuple[float, str]] = []
+        self._last_sweep = 0.0
     
     def cleanup_old_files(self):
         """Remove files older than max_age_hours"""
         try:
-            current_time = datetime.now()
+            now = time.time()
+            max_age_seconds = self.max_age_hours * 3600
+            cutoff = now - max_age_seconds
             deleted_count = 0
             total_size_freed = 0
             
-            if not os.path.exists(self.upload_dir):
-                logger.warning(f"Upload directory does not exist: {self.upload_dir}")
-                return 0
+            # A file written after a sweep cannot expire before the next one as long as sweeps are
+            # at most max_age apart, so between sweeps only the expiry heap needs checking
+            if now - self._last_sweep >= min(RECONCILE_INTERVAL_SECONDS, max_age_seconds):
+                stale = self._sweep(cutoff, max_age_seconds)
+                if stale is None:
+                    return 0
+                self._last_sweep = now
+            else:
+                stale = self._pop_expired(now, cutoff, max_age_seconds)
             
-            for filename in os.listdir(self.upload_dir):
-                file_path = os.path.join(self.upload_dir, filename)
-                
-                if os.path.isfile(file_path):
-                    file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    age = current_time - file_time
-                    
-                    if age > timedelta(hours=self.max_age_hours):
-                        try:
-                            file_size = os.path.getsize(file_path)
-                            os.remove(file_path)
-                            deleted_count += 1
-                            total_size_freed += file_size
-                            logger.info(f"Deleted old file: {file_path} (age: {age.days} days, size: {file_size / (1024*1024):.2f} MB)")
-                        except Exception as e:
-                            logger.warning(f"Could not delete file {file_path}: {str(e)}")
+            for name, file_path, file_size in stale:
+                try:
+                    if self._dirfd is not None:
+                        os.unlink(name, dir_fd=self._dirfd)
+                    else:
+                        os.unlink(file_path)
+                    deleted_count += 1
+                    total_size_freed += file_size
+                    logger.info(f"Deleted old file: {file_path}")
+                except Exception as e:
+                    logger.warning(f"Could not delete file {file_path}: {str(e)}")
             
             logger.info(f"Cleanup completed. Deleted {deleted_count} old files. Total size freed: {total_size_freed / (1024*1024):.2f} MB")
             return deleted_count
@@ -46,15 +62,70 @@ class FileHandler:
             logger.error(f"Error during file cleanup: {str(e)}", exc_info=True)
             return 0
     
+    def _sweep(self, cutoff: float, max_age_seconds: float) -> Optional[List[Tuple[str, str, int]]]:
+        """Scan the whole directory, returning stale files and rebuilding the expiry heap from the rest"""
+        try:
+            entries = os.scandir(self.upload_dir)
+        except FileNotFoundError:
+            logger.warning(f"Upload directory does not exist: {self.upload_dir}")
+            return None
+        
+        # scandir hands back cached stat data, so each file costs one stat instead of four.
+        # Collect first, then unlink in one pass.
+        stale = []
+        expiry = []
+        with entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                if st.st_mtime < cutoff:
+                    stale.append((entry.name, entry.path, st.st_size))
+                else:
+                    expiry.append((st.st_mtime + max_age_seconds, entry.name))
+        heapq.heapify(expiry)
+        self._expiry = expiry
+        return stale
+    
+    def _pop_expired(self, now: float, cutoff: float, max_age_seconds: float) -> List[Tuple[str, str, int]]:
+        """Re-check only the heap entries whose deadline has passed"""
+        stale = []
+        while self._expiry and self._expiry[0][0] <= now:
+            _, name = heapq.heappop(self._expiry)
+            file_path = os.path.join(self.upload_dir, name)
+            try:
+                if self._dirfd is not None:
+                    st = os.stat(name, dir_fd=self._dirfd, follow_symlinks=False)
+                else:
+                    st = os.stat(file_path, follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if st.st_mtime < cutoff:
+                stale.append((name, file_path, st.st_size))
+            else:
+                # Rewritten since the sweep; track its new deadline
+                heapq.heappush(self._expiry, (st.st_mtime + max_age_seconds, name))
+        return stale
+    
+    async def cleanup_old_files_async(self):
+        """Run cleanup_old_files in a worker thread so large deletions don't block the event loop"""
+        return await asyncio.to_thread(self.cleanup_old_files)
+    
     def cleanup_file(self, file_path: str):
         """Remove a specific file"""
+        # Unlink directly; a missing file is reported by the unlink itself, so no stat beforehand
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Deleted file: {file_path}")
-                return True
+            os.remove(file_path)
+            logger.info(f"Deleted file: {file_path}")
+            return True
+        except FileNotFoundError:
             return False
         except Exception as e:
             logger.warning(f"Could not delete file {file_path}: {str(e)}")
             return False
-
+    
+    def close(self):
+        """Release the upload directory handle"""
+        if self._dirfd is not None:
+            os.close(self._dirfd)
+            self._dirfd = None
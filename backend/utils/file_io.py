@@ -0,0 +1,15 @@
+import os
+from typing import IO
+
+
+def advise_sequential(f: IO) -> None:
+    """Hint the kernel that f will be read start to end, so it reads ahead more aggressively.
+
+    No-op on platforms without posix_fadvise.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except OSError:
+        pass
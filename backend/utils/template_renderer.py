@@ -0,0 +1,40 @@
+import io
+import string
+from functools import lru_cache
+from typing import Any, Mapping, Optional, Tuple
+
+_formatter = string.Formatter()
+
+# (literal_text, field_name, format_spec, conversion) as yielded by Formatter.parse
+TemplatePart = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+@lru_cache(maxsize=128)
+def compile_template(template: str) -> Tuple[TemplatePart, ...]:
+    """Parse a str.format template once; later renders reuse the parsed parts"""
+    return tuple(_formatter.parse(template))
+
+
+def render_template(template: str, mapping: Mapping[str, Any]) -> str:
+    """Render a str.format template from its cached parts.
+
+    Behaves like template.format(**mapping), including raising KeyError for missing fields.
+    """
+    out = io.StringIO()
+    for literal, field_name, format_spec, conversion in compile_template(template):
+        if literal:
+            out.write(literal)
+        if field_name is None:
+            continue
+        if field_name in mapping:
+            value = mapping[field_name]
+        else:
+            # Dotted/indexed fields such as {episode.title} or {items[0]}
+            value, _ = _formatter.get_field(field_name, (), mapping)
+        if conversion:
+            value = _formatter.convert_field(value, conversion)
+        if format_spec:
+            out.write(format(value, format_spec))
+        else:
+            out.write(str(value))
+    return out.getvalue()
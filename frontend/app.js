@@ -1626,8 +1626,6 @@ async function generateContent(forceRegenerate = false, regenerateType = null) {
     
     try {
         const requestBody = {
-            transcript: transcriptData.transcript,
-            transcript_with_timecodes: transcriptData.transcript_with_timecodes,
             guest_name: guestName,
             guest_title: guestTitle,
             guest_company: guestCompany,
@@ -1635,12 +1633,28 @@ async function generateContent(forceRegenerate = false, regenerateType = null) {
             video_title: videoInfo?.title || '',
             video_duration: videoInfo?.duration || 0
         };
+        const fullTranscript = {
+            transcript: transcriptData.transcript,
+            transcript_with_timecodes: transcriptData.transcript_with_timecodes
+        };
         
-        const response = await fetch(`${API_BASE_URL}/api/generate-content`, {
-            method: 'POST',
-            headers: getAuthHeaders(),
-            body: JSON.stringify(requestBody)
-        });
+        // The server keeps the transcript from /api/process-video, so send just the video_id first;
+        // 410 means it no longer has it (e.g. after a restart) and the full transcript is needed
+        let response;
+        if (videoInfo && videoInfo.video_id) {
+            response = await fetch(`${API_BASE_URL}/api/generate-content`, {
+                method: 'POST',
+                headers: getAuthHeaders(),
+                body: JSON.stringify({ ...requestBody, video_id: videoInfo.video_id })
+            });
+        }
+        if (!response || response.status === 410) {
+            response = await fetch(`${API_BASE_URL}/api/generate-content`, {
+                method: 'POST',
+                headers: getAuthHeaders(),
+                body: JSON.stringify({ ...requestBody, ...fullTranscript })
+            });
+        }
         
         if (response.status === 401) {
             authToken = null;
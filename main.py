@@ -1,8 +1,9 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import os
+import json
 from dotenv import load_dotenv
 import logging
 
@@ -38,6 +39,11 @@ youtube_service = YouTubeService()
 openai_service = OpenAIService()
 content_generator = ContentGenerator(openai_service)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the OpenAI connection pool"""
+    await openai_service.aclose()
+
 # Frontend path
 frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend")
 frontend_path = os.path.abspath(frontend_path)
@@ -75,21 +81,14 @@ async def health_check():
     return {"status": "healthy"}
 
 @app.post("/api/process-video", response_model=ProcessVideoResponse)
-async def process_video(request: ProcessVideoRequest, background_tasks: BackgroundTasks):
-    """Process YouTube video: download MP3 and extract transcript with timecodes"""
+async def process_video(request: ProcessVideoRequest):
+    """Process YouTube video: extract transcript with timecodes"""
     try:
         logger.info(f"Processing video: {request.youtube_url}")
         
-        # Download video and extract MP3
-        audio_path = await youtube_service.download_audio(request.youtube_url)
-        
         # Get transcript with timecodes
         transcript_data = await youtube_service.get_transcript(request.youtube_url)
         
-        # Schedule cleanup of audio file
-        if audio_path:
-            background_tasks.add_task(cleanup_file, audio_path)
-        
         return ProcessVideoResponse(
             success=True,
             transcript=transcript_data["transcript"],
@@ -107,8 +106,8 @@ async def generate_content(request: GenerateContentRequest):
     try:
         logger.info(f"Generating content for guest: {request.guest_name}")
         
-        # Generate all content
-        content = await content_generator.generate_all_content(
+        # One JSON-mode completion for every content type; falls back to per-part calls if incomplete
+        content = await content_generator.generate_all_content_fused(
             transcript=request.transcript,
             transcript_with_timecodes=request.transcript_with_timecodes,
             guest_name=request.guest_name,
@@ -124,6 +123,31 @@ async def generate_content(request: GenerateContentRequest):
         logger.error(f"Error generating content: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error generating content: {str(e)}")
 
+@app.post("/api/generate-content/stream")
+async def generate_content_stream(request: GenerateContentRequest):
+    """Stream generated content as NDJSON, one {"content_type", "value"} line per finished section"""
+    logger.info(f"Streaming content for guest: {request.guest_name}")
+    
+    async def sections():
+        try:
+            async for content_type, value in content_generator.stream_all_content_fused(
+                transcript=request.transcript,
+                transcript_with_timecodes=request.transcript_with_timecodes,
+                guest_name=request.guest_name,
+                guest_title=request.guest_title,
+                guest_company=request.guest_company,
+                guest_linkedin=request.guest_linkedin,
+                video_title=request.video_title or "",
+                video_duration=request.video_duration or 0
+            ):
+                yield json.dumps({"content_type": content_type, "value": value}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Error streaming content: {str(e)}", exc_info=True)
+            yield json.dumps({"error": f"Error generating content: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(sections(), media_type="application/x-ndjson")
+
 @app.get("/api/openai-credits")
 async def get_openai_credits():
     """Get remaining OpenAI API credits/usage"""
@@ -134,15 +158,6 @@ async def get_openai_credits():
         logger.error(f"Error fetching credits: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error fetching credits: {str(e)}")
 
-def cleanup_file(file_path: str):
-    """Cleanup temporary file"""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"Cleaned up file: {file_path}")
-    except Exception as e:
-        logger.warning(f"Failed to cleanup file {file_path}: {str(e)}")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Optional
+from typing import List, Optional, Union
 
 class ProcessVideoRequest(BaseModel):
     youtube_url: str = Field(..., description="YouTube video URL")
@@ -27,6 +27,15 @@ class GenerateContentRequest(BaseModel):
     video_title: Optional[str] = Field(None, description="Video title")
     video_duration: Optional[float] = Field(None, description="Video duration in seconds")
 
+class FusedContent(BaseModel):
+    """Fields of the single JSON-mode completion that carries every content type"""
+    youtube_summary: Union[str, List[str]]
+    blog_post: Union[str, List[str]]
+    clickbait_titles: Union[List[str], str]
+    two_line_summary: Union[str, List[str]]
+    quotes: Union[List[str], str]
+    chapter_timestamps: Union[List[str], str]
+
 class GenerateContentResponse(BaseModel):
     youtube_summary: str = Field(..., description="3 paragraph YouTube summary")
     blog_post: str = Field(..., description="2000 word blog post")
@@ -1,9 +1,108 @@
+import os
+import re
+import json
+import asyncio
 import logging
-from typing import Dict, List
-from services.openai_service import OpenAIService
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from models import FusedContent
+from services.openai_service import OpenAIService, SYSTEM_PROMPT
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json parses the same payloads, just slower
+    _loads = json.loads
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; without it streamed JSON is parsed once complete
+    ijson = None
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; without it the transcript window is cut by characters
+    tiktoken = None
+
+# Transcript window placed in the shared system message; the blog post needs the widest one,
+# and ~3k tokens keeps the common prefix above OpenAI's 1024-token prompt-cache minimum
+CONTEXT_TRANSCRIPT_TOKENS = 3000
+# Character fallback when tiktoken is unavailable (~4 chars/token)
+CONTEXT_TRANSCRIPT_CHARS = 12000
+# Only this much of the transcript is tokenized; no real token averages more than 8 characters
+MAX_CHARS_PER_TOKEN = 8
+# Chapter prompts see this many timecoded lines spread across the whole episode
+CHAPTER_SAMPLE_LINES = 150
+# Episodes shorter than this (or with fewer caption entries) get a single Introduction chapter
+MIN_CHAPTER_DURATION_SECONDS = 600
+MIN_CHAPTER_ENTRIES = 30
+MAX_CHAPTERS = 12
+# (max_tokens, temperature) per content type. Every content call passes cache=True despite sampling, so
+# re-running an episode with unchanged inputs (a retry after a failed part or a dropped stream) is served
+# from the response cache instead of paying for the whole episode again
+TASK_SETTINGS = {
+    'youtube_summary': (600, 0.7),
+    'blog_post': (2500, 0.7),
+    'clickbait_titles': (800, 0.8),
+    'two_line_summary': (200, 0.7),
+    'quotes': (1000, 0.6),
+    'chapter_timestamps': (600, 0.7),
+}
+# Content types returned as lists
+LIST_CONTENT_TYPES = frozenset({'clickbait_titles', 'quotes', 'chapter_timestamps'})
+# Short, formulaic tasks go to a smaller model. Only tasks that work from the timecoded transcript are
+# routed there: the calls sharing the episode-context system block stay on OPENAI_MODEL so the prompt
+# cache, which is per model, can reuse that prefix
+CHEAP_MODEL = os.getenv("OPENAI_MODEL_CHEAP", "gpt-4o-mini")
+TASK_MODELS = {
+    'quotes': CHEAP_MODEL,
+    'chapter_timestamps': CHEAP_MODEL,
+}
+# The fused call has to fit every part's output in one completion
+FUSED_MAX_TOKENS = sum(max_tokens for max_tokens, _ in TASK_SETTINGS.values())
+# Model prefixes that support JSON mode, with their maximum completion tokens; the fused request is
+# only sent to these when the limit fits FUSED_MAX_TOKENS (gpt-4 has neither JSON mode nor the room)
+FUSED_MODEL_MAX_OUTPUT = {
+    'gpt-4o': 16384,
+    'gpt-4.1': 32768,
+    'gpt-4-turbo': 4096,
+    'gpt-3.5-turbo': 4096,
+}
+
+# "12. Item" / "3) Item" lines; the captured item excludes surrounding whitespace
+_NUMBERED_LINE_RE = re.compile(r'^\s*\d+\s*[.)]\s*(.+?)\s*$', re.M)
+_NUMBER_PREFIX_RE = re.compile(r'^\d+\s*[.)]\s*')
+
+def _parse_numbered_lines(text: str, max_items: int, max_len: Optional[int] = None) -> List[str]:
+    """Items from an LLM-numbered list, falling back to every non-empty line when numbering is sparse"""
+    items = _NUMBERED_LINE_RE.findall(text)
+    if len(items) < max_items:
+        items = [_NUMBER_PREFIX_RE.sub('', line.strip()) for line in text.splitlines() if line.strip()]
+    if max_len is not None:
+        items = [item for item in items if item and len(item) <= max_len]
+    else:
+        items = [item for item in items if item]
+    return items[:max_items]
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str):
+    """tiktoken encoding for a model, or None when tiktoken is not installed"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+@lru_cache(maxsize=4096)
+def _fmt_hms(total_seconds: int) -> str:
+    """Format whole seconds as HH:MM:SS; transcript timecodes repeat the same seconds often"""
+    hours, rem = divmod(total_seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
 class ContentGenerator:
     def __init__(self, openai_service: OpenAIService):
         self.openai = openai_service
@@ -22,28 +121,32 @@ class ContentGenerator:
         """Generate all content types for the podcast episode"""
         logger.info(f"Generating all content for guest: {guest_name}")
         
-        # Generate all content in parallel where possible (using asyncio.gather would be ideal)
-        # For now, generating sequentially to ensure quality
-        
-        youtube_summary = await self.generate_youtube_summary(
-            transcript, guest_name, guest_title, guest_company
-        )
+        # One identical system message for every call so OpenAI's prompt cache reuses the prefix
+        system_block = self._episode_context(transcript, guest_name, guest_title, guest_company, guest_linkedin)
         
-        blog_post = await self.generate_blog_post(
-            transcript, guest_name, guest_title, guest_company, guest_linkedin
+        # Every call only depends on the transcript, so run them concurrently
+        results = await asyncio.gather(
+            self.generate_youtube_summary(transcript, guest_name, guest_title, guest_company, system_block),
+            self.generate_blog_post(transcript, guest_name, guest_title, guest_company, guest_linkedin, system_block),
+            self.generate_clickbait_titles(transcript, guest_name, guest_company, system_block),
+            self.generate_two_line_summary(transcript, system_block),
+            self.generate_quotes(transcript_with_timecodes),
+            self.generate_chapter_timestamps(transcript_with_timecodes, video_duration),
+            return_exceptions=True
         )
+        # Let the other calls finish before surfacing the first failure
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
         
-        clickbait_titles = await self.generate_clickbait_titles(
-            transcript, guest_name, guest_company
-        )
-        
-        two_line_summary = await self.generate_two_line_summary(transcript)
-        
-        quotes = await self.generate_quotes(transcript_with_timecodes)
-        
-        chapter_timestamps = await self.generate_chapter_timestamps(
-            transcript_with_timecodes, video_duration
-        )
+        (
+            youtube_summary,
+            blog_post,
+            clickbait_titles,
+            two_line_summary,
+            quotes,
+            chapter_timestamps,
+        ) = results
         
         return {
             'youtube_summary': youtube_summary,
@@ -54,19 +157,205 @@ class ContentGenerator:
             'chapter_timestamps': chapter_timestamps
         }
     
-    async def generate_youtube_summary(
-        self, transcript: str, guest_name: str, guest_title: str, guest_company: str
+    async def generate_all_content_fused(
+        self,
+        transcript: str,
+        transcript_with_timecodes: List[dict],
+        guest_name: str,
+        guest_title: str,
+        guest_company: str,
+        guest_linkedin: str,
+        video_title: str = "",
+        video_duration: float = 0
+    ) -> Dict:
+        """Generate all content types in a single JSON-mode completion.
+
+        The transcript is sent once instead of six times. Falls back to generate_all_content
+        when the response is not a complete JSON object (e.g. the output hit max_tokens).
+        """
+        if not self._fused_supported():
+            logger.info(f"Model '{self.openai.model}' cannot take the fused request; generating per part")
+            return await self.generate_all_content(
+                transcript, transcript_with_timecodes, guest_name, guest_title,
+                guest_company, guest_linkedin, video_title, video_duration
+            )
+        logger.info(f"Generating fused content for guest: {guest_name}")
+        
+        system_block = self._episode_context(transcript, guest_name, guest_title, guest_company, guest_linkedin)
+        prompt = self._fused_prompt(
+            transcript_with_timecodes, guest_name, guest_title, guest_company, guest_linkedin, video_duration
+        )
+        try:
+            response = await self.openai.generate_text(
+                prompt, FUSED_MAX_TOKENS, 0.7, system=system_block, response_format={"type": "json_object"},
+                cache=True
+            )
+            # Parses and type-checks in one pass in pydantic-core
+            content = FusedContent.model_validate_json(response)
+        except Exception as e:
+            # API errors as well as truncated or malformed JSON
+            logger.warning(f"Fused generation failed ({e}); falling back to per-part calls")
+            return await self.generate_all_content(
+                transcript, transcript_with_timecodes, guest_name, guest_title,
+                guest_company, guest_linkedin, video_title, video_duration
+            )
+        
+        return {
+            content_type: self._finalize_fused_field(
+                content_type, getattr(content, content_type), guest_name, guest_company
+            )
+            for content_type in TASK_SETTINGS
+        }
+    
+    async def stream_all_content_fused(
+        self,
+        transcript: str,
+        transcript_with_timecodes: List[dict],
+        guest_name: str,
+        guest_title: str,
+        guest_company: str,
+        guest_linkedin: str,
+        video_title: str = "",
+        video_duration: float = 0
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """Streaming generate_all_content_fused: yield (content_type, value) as each JSON field completes.
+
+        Short fields such as two_line_summary arrive long before blog_post. Fields the model
+        did not complete are generated with per-part calls at the end.
+        """
+        system_block = self._episode_context(transcript, guest_name, guest_title, guest_company, guest_linkedin)
+        done = set()
+        if self._fused_supported():
+            logger.info(f"Streaming fused content for guest: {guest_name}")
+            prompt = self._fused_prompt(
+                transcript_with_timecodes, guest_name, guest_title, guest_company, guest_linkedin, video_duration
+            )
+            stream = self.openai.generate_text_stream(
+                prompt, FUSED_MAX_TOKENS, 0.7, system=system_block, response_format={"type": "json_object"},
+                cache=True
+            )
+            try:
+                if ijson is not None:
+                    fields = ijson.sendable_list()
+                    parser = ijson.kvitems_coro(fields, '', use_float=True)
+                    async for delta in stream:
+                        parser.send(delta.encode("utf-8"))
+                        for content_type, value in fields:
+                            if content_type in TASK_SETTINGS and content_type not in done:
+                                done.add(content_type)
+                                yield content_type, self._finalize_fused_field(
+                                    content_type, value, guest_name, guest_company
+                                )
+                        del fields[:]
+                    parser.close()
+                else:
+                    data = _loads("".join([delta async for delta in stream]))
+                    for content_type in TASK_SETTINGS:
+                        if content_type in data:
+                            done.add(content_type)
+                            yield content_type, self._finalize_fused_field(
+                                content_type, data[content_type], guest_name, guest_company
+                            )
+            except Exception as e:
+                # API errors as well as truncated or malformed JSON; fields already yielded are kept
+                logger.warning(f"Fused stream failed: {e}")
+        else:
+            logger.info(f"Model '{self.openai.model}' cannot take the fused request; generating per part")
+        
+        missing = [content_type for content_type in TASK_SETTINGS if content_type not in done]
+        if not missing:
+            return
+        logger.info(f"Generating {', '.join(missing)} per part")
+        fallbacks = {
+            'youtube_summary': lambda: self.generate_youtube_summary(
+                transcript, guest_name, guest_title, guest_company, system_block),
+            'blog_post': lambda: self.generate_blog_post(
+                transcript, guest_name, guest_title, guest_company, guest_linkedin, system_block),
+            'clickbait_titles': lambda: self.generate_clickbait_titles(
+                transcript, guest_name, guest_company, system_block),
+            'two_line_summary': lambda: self.generate_two_line_summary(transcript, system_block),
+            'quotes': lambda: self.generate_quotes(transcript_with_timecodes),
+            'chapter_timestamps': lambda: self.generate_chapter_timestamps(
+                transcript_with_timecodes, video_duration),
+        }
+        results = await asyncio.gather(*(fallbacks[content_type]() for content_type in missing))
+        for content_type, value in zip(missing, results):
+            yield content_type, value
+    
+    def _fused_supported(self) -> bool:
+        """Whether the configured model has JSON mode and room for the whole fused completion"""
+        return any(
+            self.openai.model.startswith(prefix) and max_output >= FUSED_MAX_TOKENS
+            for prefix, max_output in FUSED_MODEL_MAX_OUTPUT.items()
+        )
+    
+    def _fused_prompt(
+        self, transcript_with_timecodes: List[dict], guest_name: str, guest_title: str,
+        guest_company: str, guest_linkedin: str, video_duration: float
     ) -> str:
-        """Generate 3-paragraph YouTube summary"""
-        prompt = f"""You are writing a summary for a YouTube video description for The Dollar Diaries podcast.
+        video_duration = self._episode_duration(transcript_with_timecodes, video_duration)
+        min_chapters, max_chapters = self._chapter_count_range(video_duration)
+        quotes_text = "\n".join(
+            f"[{self._format_timestamp(tc['start'])}] {tc['text']}"
+            for tc in transcript_with_timecodes[:200]
+        )
+        return f"""Create all of the following for The Dollar Diaries podcast episode above and return them as a single JSON object with exactly these keys:
+
+- "youtube_summary": a compelling 3-paragraph YouTube description. Paragraph 1 introduces the guest and their background, paragraph 2 highlights the key topics and insights, paragraph 3 teases what viewers will take away.
+- "blog_post": a comprehensive 2000-word markdown blog post with engaging subheadings, key insights, quotes and takeaways, and a strong conclusion. The first paragraph must hyperlink the guest's name to their LinkedIn profile, like this: In this episode of The Dollar Diaries, we speak with [{guest_name}]({guest_linkedin}), {guest_title} at {guest_company}, about...
+- "clickbait_titles": an array of 20 compelling, click-worthy titles, each under 100 characters, each including {guest_name} and/or {guest_company}, based on the actual content of the episode.
+- "two_line_summary": exactly two engaging lines, separated by a newline, capturing the essence of the episode.
+- "quotes": an array of the 20 most impactful complete quotes, each formatted as "[HH:MM:SS] Quote text" using the timestamps below.
+- "chapter_timestamps": an array of {min_chapters}-{max_chapters} YouTube chapters at natural topic breaks, each formatted as "HH:MM:SS - Chapter Title", starting at 00:00:00.
+
+Transcript with timestamps (for quotes):
+{quotes_text}
 
-Guest Information:
-- Name: {guest_name}
-- Title: {guest_title}
-- Company: {guest_company}
+Transcript with timecodes (for chapters, sampled):
+{self._format_transcript_for_chapters(transcript_with_timecodes)}
 
-Transcript:
-{transcript[:8000]}  # Limit transcript length for token efficiency
+Video duration: {self._format_timestamp(video_duration)}
+
+Return only the JSON object."""
+    
+    def _finalize_fused_field(self, content_type: str, value, guest_name: str, guest_company: str):
+        """Apply the per-part post-processing to one field of the fused JSON response"""
+        if isinstance(value, list) and content_type in LIST_CONTENT_TYPES:
+            # Real JSON arrays need no line splitting or numbering removal
+            items = [item for item in (str(entry).strip() for entry in value) if item]
+            if content_type == 'clickbait_titles':
+                return self._pad_titles([item for item in items if len(item) <= 100], guest_name, guest_company)
+            if content_type == 'quotes':
+                return self._pad_quotes(items)
+            return self._sort_timestamps([item for item in items if ' - ' in item])
+        text = self._as_text(value)
+        if content_type == 'clickbait_titles':
+            return self._parse_titles(text, guest_name, guest_company)
+        if content_type == 'quotes':
+            return self._parse_quotes(text)
+        if content_type == 'chapter_timestamps':
+            return self._parse_timestamps(text)
+        return text
+    
+    def _as_text(self, value) -> str:
+        """Normalize a JSON field (string or list of strings) to newline-separated text"""
+        if isinstance(value, list):
+            return "\n".join(str(item) for item in value)
+        return str(value or "").strip()
+    
+    async def generate_youtube_summary(
+        self, transcript: str, guest_name: str, guest_title: str, guest_company: str,
+        system_block: Optional[str] = None
+    ) -> str:
+        """Generate 3-paragraph YouTube summary"""
+        if system_block is None:
+            system_block = self._episode_context(transcript, guest_name, guest_title, guest_company)
+        return await self.openai.generate_text(
+            self._youtube_summary_prompt(), *TASK_SETTINGS['youtube_summary'], system=system_block, cache=True
+        )
+    
+    def _youtube_summary_prompt(self) -> str:
+        return """You are writing a summary for a YouTube video description for The Dollar Diaries podcast, based on the episode above.
 
 Please create a compelling 3-paragraph summary for YouTube that:
 1. Introduces the guest and their background in the first paragraph
@@ -74,24 +363,36 @@ Please create a compelling 3-paragraph summary for YouTube that:
 3. Teases what viewers will learn or take away in the third paragraph
 
 Make it engaging, professional, and suitable for a YouTube video description."""
-        
-        return await self.openai.generate_text(prompt, max_tokens=600, temperature=0.7)
     
     async def generate_blog_post(
         self, transcript: str, guest_name: str, guest_title: str, 
-        guest_company: str, guest_linkedin: str
+        guest_company: str, guest_linkedin: str, system_block: Optional[str] = None
     ) -> str:
         """Generate 2000-word blog post with LinkedIn hyperlink in first paragraph"""
-        prompt = f"""You are writing a comprehensive 2000-word blog post based on a podcast episode transcript from The Dollar Diaries podcast.
-
-Guest Information:
-- Name: {guest_name}
-- Title: {guest_title}
-- Company: {guest_company}
-- LinkedIn: {guest_linkedin}
-
-Transcript:
-{transcript[:12000]}  # Use more of transcript for longer blog post
+        parts = [
+            chunk async for chunk in self.stream_blog_post(
+                transcript, guest_name, guest_title, guest_company, guest_linkedin, system_block
+            )
+        ]
+        return "".join(parts).strip()
+    
+    async def stream_blog_post(
+        self, transcript: str, guest_name: str, guest_title: str,
+        guest_company: str, guest_linkedin: str, system_block: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield the blog post as it is generated, so callers can forward it before the full ~2500 tokens land"""
+        if system_block is None:
+            system_block = self._episode_context(transcript, guest_name, guest_title, guest_company, guest_linkedin)
+        prompt = self._blog_post_prompt(guest_name, guest_title, guest_company, guest_linkedin)
+        async for chunk in self.openai.generate_text_stream(
+            prompt, *TASK_SETTINGS['blog_post'], system=system_block, cache=True
+        ):
+            yield chunk
+    
+    def _blog_post_prompt(
+        self, guest_name: str, guest_title: str, guest_company: str, guest_linkedin: str
+    ) -> str:
+        return f"""You are writing a comprehensive 2000-word blog post based on the podcast episode transcript above from The Dollar Diaries podcast.
 
 Instructions:
 1. Write a comprehensive 2000-word blog post based on this episode
@@ -105,19 +406,22 @@ Format the LinkedIn hyperlink in the first paragraph like this:
 In this episode of The Dollar Diaries, we speak with [{guest_name}]({guest_linkedin}), {guest_title} at {guest_company}, about...
 
 Write the full blog post now:"""
-        
-        return await self.openai.generate_text(prompt, max_tokens=2500, temperature=0.7)
     
     async def generate_clickbait_titles(
-        self, transcript: str, guest_name: str, guest_company: str
+        self, transcript: str, guest_name: str, guest_company: str,
+        system_block: Optional[str] = None
     ) -> List[str]:
         """Generate 20 clickbait titles under 100 characters, featuring name and company"""
-        prompt = f"""Generate 20 clickbait-style titles for a podcast episode, each under 100 characters.
-
-Guest: {guest_name} from {guest_company}
-
-Transcript excerpt:
-{transcript[:6000]}
+        if system_block is None:
+            system_block = self._episode_context(transcript, guest_name, guest_company=guest_company)
+        prompt = self._clickbait_titles_prompt(guest_name, guest_company)
+        response = await self.openai.generate_text(
+            prompt, *TASK_SETTINGS['clickbait_titles'], system=system_block, cache=True
+        )
+        return self._parse_titles(response, guest_name, guest_company)
+    
+    def _clickbait_titles_prompt(self, guest_name: str, guest_company: str) -> str:
+        return f"""Generate 20 clickbait-style titles for the podcast episode above, each under 100 characters.
 
 Requirements:
 - Each title must be under 100 characters
@@ -131,51 +435,52 @@ Format:
 1. Title here
 2. Title here
 ..."""
-        
-        response = await self.openai.generate_text(prompt, max_tokens=800, temperature=0.8)
-        
-        # Parse titles from response
-        titles = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and len(line) > 0:
-                # Remove numbering if present
-                if line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                    line = line.split('.', 1)[-1].strip()
-                    line = line.split(')', 1)[-1].strip()
-                if line and len(line) <= 100:
-                    titles.append(line)
-        
+    
+    def _parse_titles(self, response: str, guest_name: str, guest_company: str) -> List[str]:
+        """Parse titles from response"""
+        return self._pad_titles(_parse_numbered_lines(response, 20, max_len=100), guest_name, guest_company)
+    
+    def _pad_titles(self, titles: List[str], guest_name: str, guest_company: str) -> List[str]:
         # Ensure we have exactly 20 titles
-        while len(titles) < 20:
-            titles.append(f"Insights from {guest_name} at {guest_company}")
+        needed = 20 - len(titles)
+        if needed > 0:
+            titles.extend([f"Insights from {guest_name} at {guest_company}"] * needed)
         
         return titles[:20]
     
-    async def generate_two_line_summary(self, transcript: str) -> str:
+    async def generate_two_line_summary(self, transcript: str, system_block: Optional[str] = None) -> str:
         """Generate a two-line summary of the episode"""
-        prompt = f"""Create a concise two-line summary of this podcast episode.
-
-Transcript:
-{transcript[:6000]}
+        if system_block is None:
+            system_block = self._episode_context(transcript)
+        return await self.openai.generate_text(
+            self._two_line_summary_prompt(), *TASK_SETTINGS['two_line_summary'], system=system_block, cache=True
+        )
+    
+    def _two_line_summary_prompt(self) -> str:
+        return """Create a concise two-line summary of the podcast episode above.
 
 Write exactly two lines that capture the essence of the episode. Make it engaging and informative.
 
 Format:
 Line 1
 Line 2"""
-        
-        return await self.openai.generate_text(prompt, max_tokens=200, temperature=0.7)
     
     async def generate_quotes(self, transcript_with_timecodes: List[dict]) -> List[str]:
         """Generate 20 notable quotes from the episode"""
+        prompt = self._quotes_prompt(transcript_with_timecodes)
+        response = await self.openai.generate_text(
+            prompt, *TASK_SETTINGS['quotes'], model=TASK_MODELS.get('quotes'), cache=True
+        )
+        return self._parse_quotes(response)
+    
+    def _quotes_prompt(self, transcript_with_timecodes: List[dict]) -> str:
         # Create a readable format from transcript with timecodes
         transcript_text = "\n".join([
             f"[{self._format_timestamp(tc['start'])}] {tc['text']}"
             for tc in transcript_with_timecodes[:200]  # Limit for efficiency
         ])
         
-        prompt = f"""Extract 20 of the most notable, insightful, or quotable statements from this podcast transcript.
+        return f"""Extract 20 of the most notable, insightful, or quotable statements from this podcast transcript.
 
 Transcript with timestamps:
 {transcript_text}
@@ -191,45 +496,48 @@ Format:
 1. [HH:MM:SS] Quote text here
 2. [HH:MM:SS] Quote text here
 ..."""
-        
-        response = await self.openai.generate_text(prompt, max_tokens=1000, temperature=0.6)
-        
-        # Parse quotes from response
-        quotes = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line and len(line) > 0:
-                # Remove numbering if present
-                if line[0].isdigit() and ('.' in line[:3] or ')' in line[:3]):
-                    line = line.split('.', 1)[-1].strip()
-                    line = line.split(')', 1)[-1].strip()
-                if line:
-                    quotes.append(line)
-        
+    
+    def _parse_quotes(self, response: str) -> List[str]:
+        """Parse quotes from response"""
+        return self._pad_quotes(_parse_numbered_lines(response, 20))
+    
+    def _pad_quotes(self, quotes: List[str]) -> List[str]:
         # Ensure we have exactly 20 quotes
-        while len(quotes) < 20:
-            quotes.append("Notable insight from the episode")
+        needed = 20 - len(quotes)
+        if needed > 0:
+            quotes.extend(["Notable insight from the episode"] * needed)
         
         return quotes[:20]
     
-    async def generate_chapter_timestamps(
-        self, transcript_with_timecodes: List[dict], video_duration: float
-    ) -> List[str]:
+    async def generate_chapter_timestamps(self, transcript_with_timecodes: List[dict], video_duration: float) -> List[str]:
         """Generate YouTube-ready chapter timestamps"""
+        duration = self._episode_duration(transcript_with_timecodes, video_duration)
+        if duration < MIN_CHAPTER_DURATION_SECONDS or len(transcript_with_timecodes) < MIN_CHAPTER_ENTRIES:
+            # Too short for meaningful chapters; skip the API call
+            return ["00:00:00 - Introduction"]
+        prompt = self._chapter_timestamps_prompt(transcript_with_timecodes, video_duration)
+        response = await self.openai.generate_text(
+            prompt, *TASK_SETTINGS['chapter_timestamps'], model=TASK_MODELS.get('chapter_timestamps'), cache=True
+        )
+        return self._parse_timestamps(response)
+    
+    def _chapter_timestamps_prompt(self, transcript_with_timecodes: List[dict], video_duration: float) -> str:
         # Analyze transcript to identify natural breaks/topics
         # For now, we'll create timestamps at regular intervals with AI-generated chapter titles
+        video_duration = self._episode_duration(transcript_with_timecodes, video_duration)
+        min_chapters, max_chapters = self._chapter_count_range(video_duration)
         
-        prompt = f"""Analyze this podcast transcript and create YouTube chapter timestamps.
+        return f"""Analyze this podcast transcript and create YouTube chapter timestamps.
 
-Transcript with timecodes (showing first 300 entries):
-{self._format_transcript_for_chapters(transcript_with_timecodes[:300])}
+Transcript with timecodes (sampled across the episode):
+{self._format_transcript_for_chapters(transcript_with_timecodes)}
 
 Video duration: {self._format_timestamp(video_duration)} seconds
 
 Create YouTube-ready chapter timestamps that:
 1. Identify natural topic breaks in the conversation
 2. Use format: 00:00:00 - Chapter Title
-3. Create 8-12 meaningful chapters
+3. Create {min_chapters}-{max_chapters} meaningful chapters
 4. Each chapter title should be descriptive and engaging
 5. Timestamps should align with topic transitions
 
@@ -237,46 +545,83 @@ Return only the timestamps in this exact format:
 00:00:00 - Chapter Title 1
 00:05:30 - Chapter Title 2
 ..."""
-        
-        response = await self.openai.generate_text(prompt, max_tokens=600, temperature=0.7)
-        
-        # Parse timestamps
+    
+    def _episode_duration(self, transcript_with_timecodes: List[dict], video_duration: float) -> float:
+        """Video duration, or the last caption's start when yt-dlp could not report it"""
+        if video_duration:
+            return video_duration
+        return transcript_with_timecodes[-1]['start'] if transcript_with_timecodes else 0
+    
+    def _chapter_count_range(self, duration: float) -> Tuple[int, int]:
+        """About one chapter per 5 minutes, so shorter episodes are not asked for 8-12 chapters"""
+        max_chapters = min(MAX_CHAPTERS, max(3, int(duration // 300)))
+        return max(2, max_chapters - 4), max_chapters
+    
+    def _parse_timestamps(self, response: str) -> List[str]:
+        """Parse chapter lines from response"""
         timestamps = []
         for line in response.split('\n'):
             line = line.strip()
             if line and ' - ' in line:
                 timestamps.append(line)
-        
+        return self._sort_timestamps(timestamps)
+    
+    def _sort_timestamps(self, timestamps: List[str]) -> List[str]:
         # Sort timestamps by time if needed
-        timestamps.sort(key=lambda x: self._parse_timestamp(x.split(' - ')[0]))
+        timestamps.sort(key=lambda x: self._parse_timestamp(x.partition(' - ')[0]))
         
         return timestamps if timestamps else ["00:00:00 - Introduction"]
     
+    def _episode_context(
+        self, transcript: str, guest_name: str = "", guest_title: str = "",
+        guest_company: str = "", guest_linkedin: str = ""
+    ) -> str:
+        """System message carrying the guest info and transcript shared by the transcript-based calls"""
+        guest_lines = [
+            f"- {label}: {value}"
+            for label, value in (
+                ("Name", guest_name), ("Title", guest_title),
+                ("Company", guest_company), ("LinkedIn", guest_linkedin)
+            )
+            if value
+        ]
+        sections = [SYSTEM_PROMPT]
+        if guest_lines:
+            sections.append("Guest Information:\n" + "\n".join(guest_lines))
+        sections.append(f"Transcript:\n{self._transcript_window(transcript)}")
+        return "\n\n".join(sections)
+    
+    def _transcript_window(self, transcript: str) -> str:
+        """First CONTEXT_TRANSCRIPT_TOKENS tokens of the transcript, so the cut matches what is billed"""
+        encoding = _get_encoding(self.openai.model)
+        if encoding is None:
+            return transcript[:CONTEXT_TRANSCRIPT_CHARS]
+        window = transcript[:CONTEXT_TRANSCRIPT_TOKENS * MAX_CHARS_PER_TOKEN]
+        tokens = encoding.encode(window)
+        if len(tokens) <= CONTEXT_TRANSCRIPT_TOKENS:
+            return window
+        return encoding.decode(tokens[:CONTEXT_TRANSCRIPT_TOKENS])
+    
     def _format_timestamp(self, seconds: float) -> str:
         """Format seconds to HH:MM:SS"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+        return _fmt_hms(int(seconds))
     
     def _parse_timestamp(self, timestamp_str: str) -> int:
         """Parse HH:MM:SS to total seconds"""
         try:
-            parts = timestamp_str.split(':')
-            if len(parts) == 3:
-                return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-            elif len(parts) == 2:
-                return int(parts[0]) * 60 + int(parts[1])
-            else:
-                return int(parts[0])
-        except:
+            parts = list(map(int, timestamp_str.split(':')))
+        except ValueError:
             return 0
+        if len(parts) == 3:
+            return parts[0] * 3600 + parts[1] * 60 + parts[2]
+        if len(parts) == 2:
+            return parts[0] * 60 + parts[1]
+        return parts[0]
     
     def _format_transcript_for_chapters(self, transcript_with_timecodes: List[dict]) -> str:
-        """Format transcript for chapter generation"""
-        lines = []
-        for tc in transcript_with_timecodes[::10]:  # Sample every 10th entry for efficiency
-            timestamp = self._format_timestamp(tc['start'])
-            lines.append(f"[{timestamp}] {tc['text']}")
-        return "\n".join(lines)
+        """Format transcript for chapter generation, sampled evenly to at most CHAPTER_SAMPLE_LINES lines"""
+        # Ceiling division so the sample reaches the end of the episode
+        stride = max(1, -(-len(transcript_with_timecodes) // CHAPTER_SAMPLE_LINES))
+        sampled = transcript_with_timecodes[::stride][:CHAPTER_SAMPLE_LINES]
+        return "\n".join(f"[{self._format_timestamp(tc['start'])}] {tc['text']}" for tc in sampled)
 
@@ -1,45 +1,156 @@
 import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Optional
-from openai import OpenAI
+import httpx
+from typing import AsyncIterator, Dict, Optional
+from openai import AsyncOpenAI
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+try:
+    import diskcache
+except ImportError:  # diskcache is optional; without it every call goes to the API
+    diskcache = None
+
+SYSTEM_PROMPT = "You are a professional content writer specializing in podcast summaries, blog posts, and marketing content."
+RESPONSE_CACHE_DIR = os.getenv(
+    "OPENAI_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "cache", "openai")
+)
+RESPONSE_CACHE_TTL_SECONDS = 30 * 86400
+# Completions at or below this temperature are treated as deterministic and cached by default;
+# sampled creative output is regenerated so a retry gives fresh text
+CACHE_MAX_TEMPERATURE = 0.3
+# Shared connection pool; sized above the fan-out so parallel calls never wait for a socket
+HTTP_MAX_CONNECTIONS = 20
+HTTP_TIMEOUT_SECONDS = 60.0
+
 class OpenAIService:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # One keep-alive HTTP/2 pool, so fanned-out calls share a TLS session instead of each handshaking
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+        )
+        self.client = AsyncOpenAI(api_key=self.api_key, http_client=self._http)
         self.model = os.getenv("OPENAI_MODEL", "gpt-4")  # Default to GPT-4 for better quality
+        # Caps in-flight requests when the content calls are fanned out, to stay within RPM limits
+        self._semaphore = asyncio.Semaphore(6)
+        # Regenerating an episode with unchanged inputs is served from disk instead of the API
+        self.cache = diskcache.Cache(RESPONSE_CACHE_DIR) if diskcache is not None else None
         
-    async def generate_text(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> str:
-        """Generate text using OpenAI API"""
+    async def generate_text(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7,
+                            system: Optional[str] = None, response_format: Optional[Dict] = None,
+                            model: Optional[str] = None, cache: Optional[bool] = None) -> str:
+        """Generate text using OpenAI API; system replaces the default system message.
+
+        Pass response_format={"type": "json_object"} for JSON mode and model to override OPENAI_MODEL.
+        Low-temperature completions are served from the response cache; pass cache to override.
+        """
+        model = model or self.model
+        extra = {'response_format': response_format} if response_format else {}
+        cache_key = None
+        use_cache = cache if cache is not None else temperature <= CACHE_MAX_TEMPERATURE
+        if self.cache is not None and use_cache:
+            cache_key = self._cache_key(model, system or SYSTEM_PROMPT, prompt, max_tokens, temperature, response_format)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("OpenAI response served from cache")
+                return cached
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional content writer specializing in podcast summaries, blog posts, and marketing content."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system or SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **extra
+                )
             
-            return response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
+            finish_reason = response.choices[0].finish_reason
         except Exception as e:
             logger.error(f"Error generating text with OpenAI: {str(e)}", exc_info=True)
             raise Exception(f"OpenAI API error: {str(e)}")
+        
+        # A completion cut off at max_tokens is not cached, so a retry can get a complete one
+        if cache_key and finish_reason == "stop":
+            self.cache.set(cache_key, content, expire=RESPONSE_CACHE_TTL_SECONDS)
+        return content
     
-    async def generate_text_with_tokens(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> Dict:
+    async def generate_text_stream(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7,
+                                   system: Optional[str] = None,
+                                   response_format: Optional[Dict] = None,
+                                   model: Optional[str] = None,
+                                   cache: Optional[bool] = None) -> AsyncIterator[str]:
+        """Like generate_text, but yield content deltas as they arrive.
+
+        The completed text is stored in the response cache; a cache hit is yielded as one chunk.
+        """
+        model = model or self.model
+        extra = {'response_format': response_format} if response_format else {}
+        cache_key = None
+        use_cache = cache if cache is not None else temperature <= CACHE_MAX_TEMPERATURE
+        if self.cache is not None and use_cache:
+            cache_key = self._cache_key(model, system or SYSTEM_PROMPT, prompt, max_tokens, temperature, response_format)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("OpenAI response served from cache")
+                yield cached
+                return
+        parts = []
+        finish_reason = None
+        try:
+            async with self._semaphore:
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system or SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    **extra
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except Exception as e:
+            logger.error(f"Error streaming text from OpenAI: {str(e)}", exc_info=True)
+            raise Exception(f"OpenAI API error: {str(e)}")
+        
+        if cache_key and finish_reason == "stop":
+            self.cache.set(cache_key, "".join(parts).strip(), expire=RESPONSE_CACHE_TTL_SECONDS)
+    
+    def _cache_key(self, model: str, system: str, prompt: str, max_tokens: int, temperature: float,
+                   response_format: Optional[Dict] = None) -> str:
+        """Digest of everything that determines a completion"""
+        payload = f"{model}|{temperature}|{max_tokens}|{response_format}|{system}|{prompt}"
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    
+    async def generate_text_with_tokens(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7,
+                                        system: Optional[str] = None, model: Optional[str] = None) -> Dict:
         """Generate text and return both content and token usage"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = await self.client.chat.completions.create(
+                model=model or self.model,
                 messages=[
-                    {"role": "system", "content": "You are a professional content writer specializing in podcast summaries, blog posts, and marketing content."},
+                    {"role": "system", "content": system or SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=max_tokens,
@@ -56,6 +167,10 @@ class OpenAIService:
             logger.error(f"Error generating text with OpenAI: {str(e)}", exc_info=True)
             raise Exception(f"OpenAI API error: {str(e)}")
     
+    async def aclose(self):
+        """Close the shared HTTP connection pool"""
+        await self._http.aclose()
+    
     async def get_credit_info(self) -> Dict:
         """Get OpenAI API credit/usage information"""
         try:
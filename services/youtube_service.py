@@ -1,5 +1,9 @@
 import yt_dlp
 import os
+import copy
+import shutil
+import asyncio
+import time
 import logging
 from typing import Dict, List, Optional
 from youtube_transcript_api import YouTubeTranscriptApi
@@ -8,30 +12,65 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# "v=" and "/" also cover the embed/ and watch?v= URL forms
+_VIDEO_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11})')
+# Extracted metadata is reused for this long; stream URLs in it stay valid for several hours
+INFO_CACHE_TTL_SECONDS = 3600
+MP3_BITRATE = "192k"
+
 class YouTubeService:
     def __init__(self, upload_dir: str = "./uploads"):
         self.upload_dir = upload_dir
         os.makedirs(upload_dir, exist_ok=True)
+        # video_id -> (unprocessed extract_info result, expiry); shared by metadata lookups and downloads
+        self._info_cache: Dict[str, tuple] = {}
         
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-            r'(?:embed\/)([0-9A-Za-z_-]{11})',
-            r'(?:watch\?v=)([0-9A-Za-z_-]{11})',
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        match = _VIDEO_ID_RE.search(url)
+        if match:
+            return match.group(1)
         raise ValueError(f"Could not extract video ID from URL: {url}")
     
+    def _get_raw_info(self, youtube_url: str) -> Dict:
+        """yt-dlp extraction result for a video, cached per video id so each video is resolved once"""
+        video_id = self._extract_video_id(youtube_url)
+        cached = self._info_cache.get(video_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        
+        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            # process=False skips format selection so each download can apply its own format
+            info = ydl.extract_info(youtube_url, download=False, process=False)
+        now = time.monotonic()
+        # Drop expired entries so the cache does not grow with every video ever processed
+        for key in [key for key, (_, expires) in self._info_cache.items() if expires <= now]:
+            del self._info_cache[key]
+        self._info_cache[video_id] = (info, now + INFO_CACHE_TTL_SECONDS)
+        return info
+    
+    def _process_info(self, ydl_opts: Dict, info: Dict, download: bool) -> tuple:
+        """Run yt-dlp format selection (and optionally the download) on a cached extraction.
+
+        Returns (processed info, output filename). Blocking; call via asyncio.to_thread. The
+        YoutubeDL instance is created here so it is never shared between threads.
+        """
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            result = ydl.process_ie_result(copy.deepcopy(info), download=download)
+            return result, ydl.prepare_filename(result)
+    
     async def download_audio(self, youtube_url: str) -> Optional[str]:
         """Download YouTube video as MP3 and return file path"""
         try:
             video_id = self._extract_video_id(youtube_url)
             output_path = os.path.join(self.upload_dir, f"{video_id}.%(ext)s")
             
+            mp3_path = os.path.join(self.upload_dir, f"{video_id}.mp3")
+            info = await asyncio.to_thread(self._get_raw_info, youtube_url)
+            if await self._stream_to_mp3(info, mp3_path):
+                logger.info(f"Successfully downloaded audio to {mp3_path}")
+                return mp3_path
+            
             ydl_opts = {
                 'format': 'bestaudio/best',
                 'outtmpl': output_path,
@@ -44,11 +83,9 @@ class YouTubeService:
                 'no_warnings': False,
             }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
+            await asyncio.to_thread(self._process_info, ydl_opts, info, True)
             
             # Return the path to the MP3 file
-            mp3_path = os.path.join(self.upload_dir, f"{video_id}.mp3")
             if os.path.exists(mp3_path):
                 logger.info(f"Successfully downloaded audio to {mp3_path}")
                 return mp3_path
@@ -60,37 +97,79 @@ class YouTubeService:
             logger.error(f"Error downloading audio: {str(e)}", exc_info=True)
             raise Exception(f"Failed to download audio: {str(e)}")
     
+    async def _stream_to_mp3(self, info: Dict, mp3_path: str) -> bool:
+        """Encode the best audio stream straight into an MP3 with ffmpeg reading from the source URL.
+
+        One streaming pass instead of downloading the container, re-reading it and writing the MP3.
+        Returns False when the stream cannot be piped (no ffmpeg, fragmented formats, ffmpeg error)
+        so the caller can fall back to yt-dlp's download + postprocessor.
+        """
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            return False
+        try:
+            selected, _ = await asyncio.to_thread(
+                self._process_info, {'format': 'bestaudio/best', 'quiet': True, 'no_warnings': True}, info, False
+            )
+        except Exception as e:
+            logger.warning(f"Could not resolve audio stream: {str(e)}")
+            return False
+        stream_url = selected.get('url')
+        if not stream_url or selected.get('protocol', 'https') not in ('http', 'https'):
+            return False
+        
+        headers = "".join(f"{key}: {value}\r\n" for key, value in (selected.get('http_headers') or {}).items())
+        args = [ffmpeg, '-nostdin', '-loglevel', 'error', '-y']
+        if headers:
+            args += ['-headers', headers]
+        args += ['-i', stream_url, '-vn', '-acodec', 'libmp3lame', '-b:a', MP3_BITRATE, mp3_path]
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            logger.warning(f"ffmpeg streaming encode failed: {stderr.decode(errors='replace').strip()}")
+            if os.path.exists(mp3_path):
+                os.remove(mp3_path)
+            return False
+        return True
+    
     async def get_transcript(self, youtube_url: str) -> Dict:
         """Get transcript with timecodes from YouTube"""
         try:
             video_id = self._extract_video_id(youtube_url)
             
+            # Metadata and captions are independent requests, so fetch them concurrently.
+            # _get_video_info never raises; a transcript failure leaves it to finish and warm the cache.
+            info_task = asyncio.create_task(self._get_video_info(youtube_url))
+            
             # Try to get transcript
             try:
-                transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+                transcript_list = await asyncio.to_thread(YouTubeTranscriptApi.get_transcript, video_id)
             except Exception as e:
                 logger.error(f"Error getting transcript: {str(e)}")
                 raise Exception(f"Transcript not available for this video: {str(e)}")
             
             # Format transcript with timecodes
-            transcript_with_timecodes = []
-            full_transcript_text = ""
+            transcript_with_timecodes = [None] * len(transcript_list)
+            parts = []
             
-            for entry in transcript_list:
+            for i, entry in enumerate(transcript_list):
                 text = entry['text'].strip()
                 start = entry['start']
                 duration = entry.get('duration', 0)
                 
-                transcript_with_timecodes.append({
+                transcript_with_timecodes[i] = {
                     'text': text,
                     'start': start,
                     'duration': duration,
                     'end': start + duration
-                })
-                full_transcript_text += text + " "
+                }
+                parts.append(text)
+            # One join instead of growing a string per entry
+            full_transcript_text = " ".join(parts)
             
-            # Get video info using yt-dlp
-            video_info = await self._get_video_info(youtube_url)
+            video_info = await info_task
             
             return {
                 'transcript': full_transcript_text.strip(),
@@ -106,17 +185,11 @@ class YouTubeService:
     async def _get_video_info(self, youtube_url: str) -> Dict:
         """Get video metadata using yt-dlp"""
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
+            info = await asyncio.to_thread(self._get_raw_info, youtube_url)
+            return {
+                'title': info.get('title', ''),
+                'duration': info.get('duration', 0)
             }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=False)
-                return {
-                    'title': info.get('title', ''),
-                    'duration': info.get('duration', 0)
-                }
         except Exception as e:
             logger.warning(f"Could not get video info: {str(e)}")
             return {'title': '', 'duration': 0}
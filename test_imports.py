@@ -1,89 +1,66 @@
 #!/usr/bin/env python3
 """Quick test to verify all imports work"""
 import sys
+import asyncio
+import importlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 print(f"Python version: {sys.version}")
 
-# Test critical imports
-print("\n✓ Testing imports...")
-try:
-    import fastapi
-    print("  ✓ fastapi")
-except Exception as e:
-    print(f"  ✗ fastapi: {e}")
-    
-try:
-    import dotenv
-    print("  ✓ dotenv")
-except Exception as e:
-    print(f"  ✗ dotenv: {e}")
-    
-try:
-    import sqlalchemy
-    print("  ✓ sqlalchemy")
-except Exception as e:
-    print(f"  ✗ sqlalchemy: {e}")
-    
-try:
-    import aiosqlite
-    print("  ✓ aiosqlite")
-except Exception as e:
-    print(f"  ✗ aiosqlite: {e}")
-
-try:
-    import openai
-    print("  ✓ openai")
-except Exception as e:
-    print(f"  ✗ openai: {e}")
+# Third-party packages have no ordering dependencies, so they are looked up in parallel
+THIRD_PARTY_MODULES = ['fastapi', 'dotenv', 'sqlalchemy', 'aiosqlite', 'openai', 'assemblyai', 'apscheduler']
 
-try:
-    import assemblyai
-    print("  ✓ assemblyai")
-except Exception as e:
-    print(f"  ✗ assemblyai: {e}")
+def is_installed(name):
+    """Resolve a module's spec without executing it; the backend section below does the real imports"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
-try:
-    import apscheduler
-    print("  ✓ apscheduler")
-except Exception as e:
-    print(f"  ✗ apscheduler: {e}")
+# Test critical imports
+print("\n✓ Testing imports...")
+with ThreadPoolExecutor(max_workers=8) as executor:
+    # map keeps submission order, so the report is deterministic
+    for name, installed in zip(THIRD_PARTY_MODULES, executor.map(is_installed, THIRD_PARTY_MODULES)):
+        if installed:
+            print(f"  ✓ {name}")
+        else:
+            print(f"  ✗ {name}: not installed")
 
 # Now test backend imports
 print("\n✓ Testing backend modules...")
 sys.path.insert(0, 'backend')
 
-try:
-    from models import ProcessVideoRequest
-    print("  ✓ models")
-except Exception as e:
-    print(f"  ✗ models: {e}")
-    sys.exit(1)
+# (module, symbols the app imports from it); checked concurrently so file reads overlap
+BACKEND_IMPORTS = [
+    ('models', ['ProcessVideoRequest']),
+    ('services.youtube_service', ['YouTubeService']),
+    ('services.openai_service', ['OpenAIService']),
+    ('services.content_generator', ['ContentGenerator']),
+    ('database', ['init_db', 'AsyncSessionLocal']),
+]
 
-try:
-    from services.youtube_service import YouTubeService
-    print("  ✓ services.youtube_service")
-except Exception as e:
-    print(f"  ✗ services.youtube_service: {e}")
-    sys.exit(1)
+def import_symbols(name, symbols):
+    """Import a module and fetch the given names from it, as a from-import would"""
+    module = importlib.import_module(name)
+    for symbol in symbols:
+        getattr(module, symbol)
 
-try:
-    from services.openai_service import OpenAIService
-    print("  ✓ services.openai_service")
-except Exception as e:
-    print(f"  ✗ services.openai_service: {e}")
-    sys.exit(1)
-
-try:
-    from services.content_generator import ContentGenerator
-    print("  ✓ services.content_generator")
-except Exception as e:
-    print(f"  ✗ services.content_generator: {e}")
-    sys.exit(1)
+async def check_backend_imports():
+    """Run every backend import in a worker thread; failures come back as exceptions in list order"""
+    return await asyncio.gather(
+        *[asyncio.to_thread(import_symbols, name, symbols) for name, symbols in BACKEND_IMPORTS],
+        return_exceptions=True
+    )
 
-try:
-    from database import init_db, AsyncSessionLocal
-    print("  ✓ database")
-except Exception as e:
-    print(f"  ✗ database: {e}")
+failed = False
+for (name, _), result in zip(BACKEND_IMPORTS, asyncio.run(check_backend_imports())):
+    if isinstance(result, Exception):
+        print(f"  ✗ {name}: {result}")
+        failed = True
+    else:
+        print(f"  ✓ {name}")
+if failed:
     sys.exit(1)
 
 print("\n✅ All imports successful!")
@@ -5,12 +5,64 @@ based on the current GitHub commit count + 1.
 """
 
 import re
+import json
+import os
+import mmap
 import subprocess
 import sys
 from pathlib import Path
 
+# Commit count of origin/main keyed by its sha, so an unchanged tip skips the rev-list walk
+REVCOUNT_CACHE_PATH = Path(__file__).parent / '.git' / '21sixty-revcount-cache.json'
+
+# Version markers in frontend/index.html, matched in a single scan: the title tag, and the h1 in
+# the new format (<h1>21SIXTY CONTENT GEN <span class="version">v26</span></h1>), the old format
+# (<h1>21SIXTY CONTENT GEN v26</h1>) or with no version at all
+VERSION_RE = re.compile(
+    r'<title>21SIXTY CONTENT GEN v\d+</title>'
+    r'|<h1 class="title">21SIXTY CONTENT GEN(?:\s*<span class="version">v\d+</span>| v\d+|)</h1>'
+)
+# Same markers over raw bytes, capturing the digits only where the markup is already in its final form
+VERSION_PATCH_RE = re.compile(
+    rb'<title>21SIXTY CONTENT GEN v(\d+)</title>'
+    rb'|<h1 class="title">21SIXTY CONTENT GEN'
+    rb'(?: <span class="version">v(\d+)</span>|\s*<span class="version">v\d+</span>| v\d+|)</h1>'
+)
+
+def get_ref_sha(ref):
+    """Resolve a ref to its commit sha, or None if git cannot resolve it"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', ref],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout.strip()
+    except subprocess.CalledProcessError:
+        return None
+
+def get_remote_sha():
+    """Read the remote main tip with ls-remote, which transfers a single ref instead of objects"""
+    try:
+        result = subprocess.run(
+            ['git', 'ls-remote', 'origin', 'refs/heads/main'],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except subprocess.CalledProcessError:
+        return None
+    fields = result.stdout.split()
+    return fields[0] if fields else None
+
 def fetch_from_github():
     """Fetch the latest changes from GitHub"""
+    remote_sha = get_remote_sha()
+    if remote_sha and remote_sha == get_ref_sha('origin/main'):
+        print("origin/main is already up to date, skipping fetch")
+        return True
+    
     try:
         print("Fetching latest changes from GitHub...")
         result = subprocess.run(
@@ -25,20 +77,45 @@ def fetch_from_github():
         print(f"Warning: Failed to fetch from GitHub: {e.stderr}", file=sys.stderr)
         return False
 
+def read_cached_count(sha):
+    """Return the cached commit count if it was recorded for sha"""
+    try:
+        cache = json.loads(REVCOUNT_CACHE_PATH.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if isinstance(cache, dict) and cache.get('sha') == sha and isinstance(cache.get('count'), int):
+        return cache['count']
+    return None
+
+def write_cached_count(sha, count):
+    """Record the commit count for sha; failures only cost a rev-list next run"""
+    try:
+        REVCOUNT_CACHE_PATH.write_text(json.dumps({'sha': sha, 'count': count}), encoding='utf-8')
+    except OSError as e:
+        print(f"Warning: Could not write commit count cache: {e}", file=sys.stderr)
+
 def get_commit_count():
     """Get the current commit count from GitHub"""
     # Always fetch first to ensure we have the latest commit count
     fetch_from_github()
     
+    sha = get_ref_sha('origin/main')
+    if sha:
+        cached_count = read_cached_count(sha)
+        if cached_count is not None:
+            return cached_count
+    
     try:
         # Get commit count from origin/main (should be up-to-date after fetch)
+        # Output is a bare ASCII integer, so it is parsed from bytes without decoding
         result = subprocess.run(
             ['git', 'rev-list', '--count', 'origin/main'],
             capture_output=True,
-            text=True,
             check=True
         )
         commit_count = int(result.stdout.strip())
+        if sha:
+            write_cached_count(sha, commit_count)
         return commit_count
     except subprocess.CalledProcessError as e:
         print(f"Error getting commit count from origin/main: {e}", file=sys.stderr)
@@ -47,7 +124,6 @@ def get_commit_count():
             result = subprocess.run(
                 ['git', 'rev-list', '--count', 'HEAD'],
                 capture_output=True,
-                text=True,
                 check=True
             )
             commit_count = int(result.stdout.strip())
@@ -57,59 +133,84 @@ def get_commit_count():
             print("Error: Could not get commit count from git", file=sys.stderr)
             sys.exit(1)
 
+def has_version(file_path, version):
+    """Check whether the title and h1 already show version, scanning a memory map instead of decoding the file"""
+    title_marker = f'21SIXTY CONTENT GEN v{version}</title>'.encode('utf-8')
+    h1_marker = f'<span class="version">v{version}</span></h1>'.encode('utf-8')
+    try:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.find(title_marker) != -1 and mapped.find(h1_marker) != -1
+    except (OSError, ValueError):  # ValueError: an empty file cannot be mapped
+        return False
+
+def patch_version_in_place(file_path, new_version):
+    """Overwrite the version digits inside a memory map when they keep their width.
+
+    Returns False, leaving the file untouched, when any marker needs more than a same-width digit swap.
+    """
+    new_digits = str(new_version).encode('ascii')
+    try:
+        with open(file_path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mapped:
+            spans = []
+            for match in VERSION_PATCH_RE.finditer(mapped):
+                if match.lastindex is None:
+                    return False
+                start, end = match.span(match.lastindex)
+                if end - start != len(new_digits):
+                    return False
+                spans.append((start, end))
+            if not spans:
+                return False
+            for start, end in spans:
+                mapped[start:end] = new_digits
+            mapped.flush()
+    except (OSError, ValueError):  # ValueError: an empty file cannot be mapped
+        return False
+    return True
+
 def update_version_in_file(file_path, new_version):
-    """Update version number in the HTML file"""
+    """Update version number in the HTML file; returns True once the file shows new_version"""
     file_path = Path(file_path)
     
     if not file_path.exists():
         print(f"Error: File {file_path} not found", file=sys.stderr)
         sys.exit(1)
     
+    if has_version(file_path, new_version):
+        print(f"Version is already v{new_version} in {file_path}")
+        return True
+    
+    if patch_version_in_place(file_path, new_version):
+        print(f"Updated version to v{new_version} in {file_path}")
+        return True
+    
     # Read the file
     content = file_path.read_text(encoding='utf-8')
     
-    # Pattern to match version numbers in title tag and h1 tag
-    # Supports both old format (<h1>21SIXTY CONTENT GEN v26</h1>) and new format (<h1>21SIXTY CONTENT GEN <span class="version">v26</span></h1>)
-    updated_content = content
-    changes_made = False
-    
-    # Update title tag
-    title_pattern = r'<title>21SIXTY CONTENT GEN v\d+</title>'
     title_replacement = f'<title>21SIXTY CONTENT GEN v{new_version}</title>'
-    if re.search(title_pattern, updated_content):
-        updated_content = re.sub(title_pattern, title_replacement, updated_content)
-        changes_made = True
-    
-    # Update h1 tag - check for new format first (with span), then old format (without span), then no version
-    # Pattern 1: With span (new format): <h1 class="title">21SIXTY CONTENT GEN <span class="version">v26</span></h1>
-    h1_with_span_pattern = r'(<h1 class="title">21SIXTY CONTENT GEN\s*)<span class="version">v\d+</span>(</h1>)'
-    if re.search(h1_with_span_pattern, updated_content):
-        updated_content = re.sub(h1_with_span_pattern, f'\\1<span class="version">v{new_version}</span>\\2', updated_content)
-        changes_made = True
-    # Pattern 2: Old format with inline version: <h1 class="title">21SIXTY CONTENT GEN v26</h1>
-    elif re.search(r'<h1 class="title">21SIXTY CONTENT GEN v\d+</h1>', updated_content):
-        updated_content = re.sub(
-            r'<h1 class="title">21SIXTY CONTENT GEN v\d+</h1>',
-            f'<h1 class="title">21SIXTY CONTENT GEN <span class="version">v{new_version}</span></h1>',
-            updated_content
-        )
-        changes_made = True
-    # Pattern 3: No version at all: <h1 class="title">21SIXTY CONTENT GEN</h1>
-    elif re.search(r'<h1 class="title">21SIXTY CONTENT GEN</h1>', updated_content):
-        updated_content = re.sub(
-            r'<h1 class="title">21SIXTY CONTENT GEN</h1>',
-            f'<h1 class="title">21SIXTY CONTENT GEN <span class="version">v{new_version}</span></h1>',
-            updated_content
-        )
-        changes_made = True
+    h1_replacement = f'<h1 class="title">21SIXTY CONTENT GEN <span class="version">v{new_version}</span></h1>'
+    updated_content, n = VERSION_RE.subn(
+        lambda m: title_replacement if m.group(0).startswith('<title>') else h1_replacement,
+        content
+    )
+    changes_made = n > 0
     
     # Check if anything changed
     if not changes_made:
         print(f"No version numbers found to update in {file_path}")
         return False
     
-    # Write back to file
-    file_path.write_text(updated_content, encoding='utf-8')
+    if updated_content == content:
+        print(f"Version is already v{new_version} in {file_path}")
+        return True
+    
+    # Write back atomically so a crash mid-write never leaves a truncated index.html
+    tmp_file = file_path.with_suffix('.html.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(updated_content.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, file_path)
     print(f"Updated version to v{new_version} in {file_path}")
     return True
 
@@ -147,15 +248,30 @@ def commit_and_push(file_path, version):
                 capture_output=True
             )
             
-            # Fetch again before push to ensure we're up-to-date
-            fetch_from_github()
-            
-            # Push to GitHub
+            # Push to GitHub; the push detects a moved remote itself, so only a rejected push pays for a fetch
             print(f"Pushing to GitHub...")
-            subprocess.run(
+            push_result = subprocess.run(
                 ['git', 'push', 'origin', 'main'],
-                check=True
+                capture_output=True,
+                text=True
             )
+            if push_result.returncode != 0:
+                if 'non-fast-forward' not in push_result.stderr and 'fetch first' not in push_result.stderr:
+                    raise subprocess.CalledProcessError(
+                        push_result.returncode, push_result.args, push_result.stdout, push_result.stderr
+                    )
+                print("Push rejected because origin/main moved, rebasing and retrying...")
+                fetch_from_github()
+                subprocess.run(
+                    ['git', 'rebase', 'origin/main'],
+                    check=True,
+                    capture_output=True
+                )
+                subprocess.run(
+                    ['git', 'push', 'origin', 'main'],
+                    check=True,
+                    capture_output=True
+                )
             print(f"Successfully pushed version v{version} to GitHub")
             return True
         else: